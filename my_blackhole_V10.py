@@ -1,19 +1,34 @@
 # my_blackhole.py
 import base64
 import datetime
+import functools
+import hashlib
 import os
-from typing import Optional, Tuple, List, Union, Dict, Any
+import threading
+from collections import OrderedDict
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from types import MappingProxyType
+from typing import Optional, Tuple, List, Union, Dict, Any, Mapping
 
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
 import streamlit as st
 import html as _html
 import json as _json
-from string import Template
+from string import Template, ascii_letters, digits
 from streamlit.components.v1 import html as st_html
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # --- (노동요 탭용) 추가 의존성 ---
 import re
 import time
+from array import array
+from itertools import accumulate
+from operator import attrgetter
 from dataclasses import dataclass
 try:
     import yt_dlp as ytdlp
@@ -25,28 +40,62 @@ except Exception:
     YouTube = None
 # ------------------------------
 
+# 대용량 base64는 SIMD 가속(pybase64)이 있으면 사용, 없으면 표준 라이브러리
+try:
+    import pybase64 as _b64
+except Exception:
+    _b64 = base64
+# pybase64는 base64를 바로 str로 만들어 주므로 bytes → str 복사 한 번이 빠짐
+_b64encode_str = getattr(_b64, "b64encode_as_string", None) or (lambda b: _b64.b64encode(b).decode("ascii"))
+try:
+    import orjson
+except Exception:
+    orjson = None
+
 APP_TITLE = "My Blackhole — GitHub Cloud Web-Hard"
 
 # =============================
 # GitHub helpers
 # =============================
 
-def gh_headers(token: str):
-    return {
+@functools.lru_cache(maxsize=4)
+def gh_headers(token: str) -> Mapping[str, str]:
+    # 토큰별로 한 번만 만들고 읽기 전용 뷰로 공유
+    return MappingProxyType({
         "Authorization": f"Bearer {token}",
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28",
-    }
+    })
+
+@functools.lru_cache(maxsize=4)
+def gh_raw_headers(token: str) -> Mapping[str, str]:
+    return MappingProxyType({**gh_headers(token), "Accept": "application/vnd.github.raw"})
+
+@functools.lru_cache(maxsize=4)
+def gh_json_headers(token: str) -> Mapping[str, str]:
+    # 본문을 직접 만든 JSON 바이트로 보낼 때 (data=)
+    return MappingProxyType({**gh_headers(token), "Content-Type": "application/json"})
 
 def gh_api_base(owner: str, repo: str) -> str:
     return f"https://api.github.com/repos/{owner}/{repo}"
 
+@functools.lru_cache(maxsize=256)
+def gh_contents_url(owner: str, repo: str, path: str) -> str:
+    # 같은 경로(메모/스니펫/폴더)는 매 rerun 반복되므로 인코딩한 URL을 재사용. '#', '?' 등이 든 파일명도 안전
+    base = f"{gh_api_base(owner, repo)}/contents"
+    return f"{base}/{urllib.parse.quote(path, safe='/')}" if path else base
+
 def gh_raw_base(owner: str, repo: str, branch: str) -> str:
     return f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}"
 
-def request_kwargs():
+def _tls_verify() -> Union[bool, str]:
+    # 기본은 certifi 번들로 TLS 검증. 사내 프록시 등으로 꼭 꺼야 하면 TLS_VERIFY = false
     ca_path = st.secrets.get("CA_BUNDLE_PATH", "")
-    verify = ca_path if ca_path else False
+    return ca_path if ca_path else bool(st.secrets.get("TLS_VERIFY", True))
+
+@st.cache_resource(show_spinner=False)
+def _configure_proxies() -> Optional[Dict[str, str]]:
+    """secrets의 프록시 설정을 프로세스당 한 번만 환경변수에 반영하고 proxies dict 반환."""
     http_proxy  = st.secrets.get("HTTP_PROXY", "")
     https_proxy = st.secrets.get("HTTPS_PROXY", "")
     no_proxy    = st.secrets.get("NO_PROXY", "")
@@ -58,7 +107,61 @@ def request_kwargs():
     if http_proxy:  os.environ["HTTP_PROXY"]  = http_proxy
     if https_proxy: os.environ["HTTPS_PROXY"] = https_proxy
     if no_proxy:    os.environ["NO_PROXY"]    = no_proxy
-    return {"verify": verify, "proxies": proxies}
+    return proxies
+
+@st.cache_resource(show_spinner=False)
+def _gh_session() -> requests.Session:
+    """프로세스 전체에서 재사용하는 HTTP 세션 (keep-alive + 커넥션 풀). GitHub/oEmbed 공용."""
+    s = requests.Session()
+    # GitHub 권장 동시성(~10)에 맞춘 풀 크기 + 429/5xx 지수 백오프 재시도
+    # raise_on_status=False: 재시도 소진 시 마지막 응답을 그대로 받아 호출부의 오류 메시지 유지
+    adapter = HTTPAdapter(
+        pool_connections=2, pool_maxsize=10,
+        max_retries=Retry(
+            total=3, backoff_factor=0.4,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "PUT", "DELETE", "POST", "PATCH"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    s.mount("https://", adapter)
+    s.verify = _tls_verify()
+    if s.verify is False:
+        urllib3.disable_warnings(InsecureRequestWarning)
+    proxies = _configure_proxies()
+    if proxies:
+        s.proxies.update(proxies)
+    return s
+
+_GH_SESSION = _gh_session()
+
+@st.cache_resource(show_spinner=False)
+def _gh_pool() -> ThreadPoolExecutor:
+    """서로 독립적인 GitHub 왕복을 동시에 보내기 위한 공용 스레드 풀."""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="gh")
+
+_GH_POOL = _gh_pool()
+
+def _submit_with_ctx(pool: ThreadPoolExecutor, fn, *args, **kwargs) -> Future:
+    """현재 ScriptRunContext를 붙여서 실행 (워커에서도 session_state/st.cache_* 사용 가능)."""
+    ctx = get_script_run_ctx()
+    def _run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return pool.submit(_run)
+
+def _gh_submit(fn, *args, **kwargs) -> Future:
+    return _submit_with_ctx(_GH_POOL, fn, *args, **kwargs)
+
+# 캐시 키에 토큰 원문이 남지 않도록 문자열 인자는 sha256으로 해시
+_SECRET_SAFE_HASH = {str: lambda s: hashlib.sha256(s.encode("utf-8")).digest()}
+
+def _invalidate_gh_caches():
+    """쓰기(PUT/DELETE) 이후 목록/스니펫 캐시 무효화."""
+    list_folder.clear()
+    load_snippets.clear()
+    list_json_files.clear()
 
 def path_join(*parts: str) -> str:
     clean = [str(p).strip().strip("/") for p in parts if str(p).strip()]
@@ -67,85 +170,358 @@ def path_join(*parts: str) -> str:
 def ensure_folder_path(path: str) -> str:
     return path.strip().strip("/")
 
-def get_file_sha_if_exists(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[Optional[str], Optional[dict]]:
-    url = f"{gh_api_base(owner, repo)}/contents/{path}"
-    r = requests.get(url, params={"ref": branch}, headers=gh_headers(token), timeout=30, **request_kwargs())
+# ETag/blob 본문 캐시 상한 (프로세스 전체, 오래된 것부터 버림)
+GH_BODY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+@st.cache_resource(show_spinner=False)
+def _gh_body_cache() -> Tuple["OrderedDict[str, Tuple[Optional[str], Any, int]]", threading.Lock, List[int]]:
+    """key → (etag, body, size). 세션 사이에서도 304/동일 blob을 재활용하는 LRU."""
+    return OrderedDict(), threading.Lock(), [0]
+
+def _body_cache_get(key: str) -> Optional[Tuple[Optional[str], Any, int]]:
+    cache, lock, _ = _gh_body_cache()
+    with lock:
+        hit = cache.get(key)
+        if hit is not None:
+            cache.move_to_end(key)
+        return hit
+
+def _body_cache_put(key: str, etag: Optional[str], body: Any, size: int):
+    cache, lock, total = _gh_body_cache()
+    if size > GH_BODY_CACHE_MAX_BYTES // 4:
+        return
+    with lock:
+        old = cache.pop(key, None)
+        if old is not None:
+            total[0] -= old[2]
+        cache[key] = (etag, body, size)
+        total[0] += size
+        while total[0] > GH_BODY_CACHE_MAX_BYTES and cache:
+            total[0] -= cache.popitem(last=False)[1][2]
+
+def _body_cache_pop(key: str):
+    cache, lock, total = _gh_body_cache()
+    with lock:
+        old = cache.pop(key, None)
+        if old is not None:
+            total[0] -= old[2]
+
+def _gh_get_cached(url: str, headers: Mapping[str, str], params: Optional[dict] = None, timeout: int = 30, raw: bool = False) -> Tuple[requests.Response, Any]:
+    """ETag(If-None-Match) 조건부 GET. 304면 캐시된 본문을 그대로 돌려줌 (rate limit 미소모)."""
+    key = f"{url}|{(params or {}).get('ref', '')}|{'raw' if raw else 'json'}"
+    hit = _body_cache_get(key)
+    if hit and hit[0]:
+        headers = {**headers, "If-None-Match": hit[0]}
+    r = _GH_SESSION.get(url, params=params, headers=headers, timeout=timeout)
+    if r.status_code == 304 and hit:
+        return r, hit[1]
     if r.status_code == 200:
-        data = r.json()
+        body = r.content if raw else r.json()
+        etag = r.headers.get("ETag")
+        if etag:
+            _body_cache_put(key, etag, body, len(r.content))
+        return r, body
+    _body_cache_pop(key)
+    return r, None
+
+def get_file_sha_if_exists(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[Optional[str], Optional[dict]]:
+    url = gh_contents_url(owner, repo, path)
+    r, data = _gh_get_cached(url, gh_headers(token), params={"ref": branch}, timeout=30)
+    if data is not None:
         return data.get("sha"), data
     elif r.status_code == 404:
         return None, None
     else:
         raise RuntimeError(f"GitHub GET contents failed: {r.status_code} {r.text}")
 
+def _gh_branch_head(owner: str, repo: str, branch: str, token: str) -> str:
+    r = _GH_SESSION.get(f"{gh_api_base(owner, repo)}/git/ref/heads/{branch}", headers=gh_headers(token), timeout=30)
+    if r.status_code != 200:
+        raise RuntimeError(f"GitHub GET ref failed: {r.status_code} {r.text}")
+    return r.json()["object"]["sha"]
+
+# 이보다 큰 파일은 Contents API 대신 Git Data API(blob → tree → commit → ref)로 올림
+GIT_DATA_THRESHOLD = 1_000_000
+
+def _json_with_b64(fields: dict, key: str, content_bytes: bytes) -> bytes:
+    """fields에 key=base64(content)를 더한 JSON 바이트. base64는 str로 바꾸지 않고 bytes 그대로 이어 붙임."""
+    head = _json_dumps_bytes(fields, compact=True)
+    return b"".join((head[:-1], b',"' if fields else b'"', key.encode("ascii"), b'":"', _b64.b64encode(content_bytes), b'"}'))
+
+def _gh_create_blob(owner: str, repo: str, content_bytes: bytes, token: str) -> str:
+    r = _GH_SESSION.post(f"{gh_api_base(owner, repo)}/git/blobs", headers=gh_json_headers(token), timeout=120,
+                         data=_json_with_b64({"encoding": "base64"}, "content", content_bytes))
+    if r.status_code != 201:
+        raise RuntimeError(f"GitHub blob create failed: {r.status_code} {r.text}")
+    return r.json()["sha"]
+
+def _put_file_git_data(owner: str, repo: str, branch: str, path: str, content_bytes: bytes, token: str, message: str) -> dict:
+    commit = git_upload_many(owner, repo, branch, [(path, content_bytes)], token, message)
+    # Contents API 응답과 같은 모양으로 반환
+    return {"content": {"path": path, "sha": git_blob_sha(content_bytes)}, "commit": commit}
+
+def git_upload_many(owner: str, repo: str, branch: str, files: List[Tuple[str, bytes]], token: str, message: str) -> dict:
+    """여러 파일을 커밋 1개로: blob들을 동시에 만들고 tree → commit → ref 순으로 한 번씩."""
+    base = gh_api_base(owner, repo)
+    headers = gh_headers(token)
+    if len(files) == 1:
+        blob_shas = [_gh_create_blob(owner, repo, files[0][1], token)]
+    else:
+        futs = [_gh_submit(_gh_create_blob, owner, repo, c, token) for _, c in files]
+        blob_shas = [fut.result() for fut in futs]
+
+    parent_sha = _gh_branch_head(owner, repo, branch, token)
+    r = _GH_SESSION.get(f"{base}/git/commits/{parent_sha}", headers=headers, timeout=30)
+    if r.status_code != 200:
+        raise RuntimeError(f"GitHub GET commit failed: {r.status_code} {r.text}")
+    base_tree = r.json()["tree"]["sha"]
+
+    r = _GH_SESSION.post(f"{base}/git/trees", headers=headers, timeout=30, json={
+        "base_tree": base_tree,
+        "tree": [{"path": p, "mode": "100644", "type": "blob", "sha": b} for (p, _), b in zip(files, blob_shas)],
+    })
+    if r.status_code != 201:
+        raise RuntimeError(f"GitHub tree create failed: {r.status_code} {r.text}")
+    tree_sha = r.json()["sha"]
+
+    r = _GH_SESSION.post(f"{base}/git/commits", headers=headers, timeout=30,
+                         json={"message": message, "tree": tree_sha, "parents": [parent_sha]})
+    if r.status_code != 201:
+        raise RuntimeError(f"GitHub commit create failed: {r.status_code} {r.text}")
+    commit = r.json()
+
+    r = _GH_SESSION.patch(f"{base}/git/refs/heads/{branch}", headers=headers, timeout=30,
+                          json={"sha": commit["sha"]})
+    if r.status_code != 200:
+        raise RuntimeError(f"GitHub ref update failed: {r.status_code} {r.text}")
+    _invalidate_gh_caches()
+    return commit
+
+def git_blob_sha(content_bytes: bytes) -> str:
+    """git이 blob에 매기는 sha1 (Contents API의 sha와 동일)."""
+    h = hashlib.sha1(b"blob %d\0" % len(content_bytes))
+    h.update(content_bytes)
+    return h.hexdigest()
+
+def get_file_raw_and_sha(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[Optional[str], Optional[bytes]]:
+    """raw 미디어 타입으로 받아 base64 JSON 래핑/디코드를 생략. sha는 본문에서 직접 계산."""
+    url = gh_contents_url(owner, repo, path)
+    r, body = _gh_get_cached(url, gh_raw_headers(token), params={"ref": branch}, timeout=30, raw=True)
+    if body is not None:
+        return git_blob_sha(body), body
+    elif r.status_code == 404:
+        return None, None
+    else:
+        raise RuntimeError(f"GitHub GET contents failed: {r.status_code} {r.text}")
+
 def put_file(owner: str, repo: str, branch: str, path: str, content_bytes: bytes, token: str, message: str, sha: Optional[str] = None) -> dict:
-    url = f"{gh_api_base(owner, repo)}/contents/{path}"
-    payload = {"message": message, "content": base64.b64encode(content_bytes).decode("utf-8"), "branch": branch}
+    if len(content_bytes) > GIT_DATA_THRESHOLD:
+        return _put_file_git_data(owner, repo, branch, path, content_bytes, token, message)
+    url = gh_contents_url(owner, repo, path)
+    payload = {"message": message, "branch": branch}
     if sha: payload["sha"] = sha
-    r = requests.put(url, headers=gh_headers(token), json=payload, timeout=60, **request_kwargs())
+    r = _GH_SESSION.put(url, headers=gh_json_headers(token), data=_json_with_b64(payload, "content", content_bytes), timeout=60)
     if r.status_code in (200, 201):
+        _invalidate_gh_caches()
         return r.json()
     else:
         raise RuntimeError(f"GitHub PUT failed: {r.status_code} {r.text}")
 
-def list_folder(owner: str, repo: str, branch: str, folder: str, token: str) -> List[dict]:
-    url = f"{gh_api_base(owner, repo)}/contents/{folder}" if folder else f"{gh_api_base(owner, repo)}/contents"
-    r = requests.get(url, params={"ref": branch}, headers=gh_headers(token), timeout=30, **request_kwargs())
-    if r.status_code == 200:
-        data = r.json()
+# Contents API는 폴더 항목을 최대 1000개까지만 돌려줌 (페이지네이션 없음)
+GH_CONTENTS_LIST_MAX = 1000
+
+def _gh_get_tree(owner: str, repo: str, branch: str, folder: Optional[str], token: str) -> Tuple[List[dict], bool]:
+    """(항목, truncated). folder가 None이면 브랜치 전체(recursive), 아니면 그 폴더 바로 아래만.
+    항목 수/크기 한도를 넘으면 GitHub가 일부만 주고 truncated를 켬."""
+    tree_ish = urllib.parse.quote(branch, safe="")
+    if folder is not None:
+        tree_ish += ":" + urllib.parse.quote(folder, safe="/")   # <브랜치>:<경로> 형식의 트리 지정
+    recursive = folder is None
+    url = f"{gh_api_base(owner, repo)}/git/trees/{tree_ish}"
+    r, data = _gh_get_cached(url, gh_headers(token), params={"recursive": "1"} if recursive else None, timeout=60)
+    if data is None:
+        raise RuntimeError(f"GitHub GET tree failed: {r.status_code} {r.text}")
+    return data.get("tree", []), bool(data.get("truncated"))
+
+def _tree_entry_type(it: dict) -> str:
+    # Contents API와 같은 이름으로 (submodule은 commit, symlink는 mode 120000인 blob)
+    if it.get("type") == "tree":
+        return "dir"
+    if it.get("type") == "commit":
+        return "submodule"
+    return "symlink" if it.get("mode") == "120000" else "file"
+
+def _list_folder_via_tree(owner: str, repo: str, branch: str, folder: str, token: str) -> List[dict]:
+    """브랜치 트리(recursive) 한 번으로 폴더 바로 아래 항목을 Contents API와 같은 모양으로."""
+    prefix = f"{folder}/" if folder else ""
+    tree, truncated = _gh_get_tree(owner, repo, branch, None, token)
+    if not truncated:
+        entries = [it for it in tree
+                   if it.get("path", "").startswith(prefix) and "/" not in it.get("path", "")[len(prefix):]]
+    else:
+        # 큰 리포는 recursive 응답이 잘림: 폴더 자체의 트리만 받음 (바로 아래 항목뿐이라 이것까지 잘리면 오류)
+        tree, truncated = _gh_get_tree(owner, repo, branch, folder, token)
+        if truncated:
+            raise RuntimeError(f"GitHub tree truncated: {folder or '/'}")
+        entries = [{**it, "path": prefix + it.get("path", "")} for it in tree]
+    return [{"name": it["path"][len(prefix):], "path": it["path"], "sha": it.get("sha"), "size": it.get("size", 0),
+             "type": _tree_entry_type(it)} for it in entries]
+
+def _list_folder_fresh(owner: str, repo: str, branch: str, folder: str, token: str) -> List[dict]:
+    """캐시 없이 현재 폴더 목록 (조건부 GET이라 변경이 없으면 304)."""
+    url = gh_contents_url(owner, repo, folder)
+    r, data = _gh_get_cached(url, gh_headers(token), params={"ref": branch}, timeout=30)
+    if data is not None:
+        if isinstance(data, list) and len(data) >= GH_CONTENTS_LIST_MAX:
+            # 잘렸을 수 있으므로 트리 API로 전체 목록을 다시 받음
+            return _list_folder_via_tree(owner, repo, branch, folder, token)
         return data if isinstance(data, list) else [data]
     elif r.status_code == 404:
         return []
     else:
         raise RuntimeError(f"GitHub list folder failed: {r.status_code} {r.text}")
 
-def delete_file(owner: str, repo: str, branch: str, path: str, token: str, message: str) -> dict:
-    sha, _ = get_file_sha_if_exists(owner, repo, branch, path, token)
+@st.cache_data(ttl=30, show_spinner=False, hash_funcs=_SECRET_SAFE_HASH)
+def list_folder(owner: str, repo: str, branch: str, folder: str, token: str) -> List[dict]:
+    return _list_folder_fresh(owner, repo, branch, folder, token)
+
+@st.cache_resource(show_spinner=False)
+def _list_folder_inflight() -> Tuple[Dict[tuple, Future], threading.Lock]:
+    return {}, threading.Lock()
+
+def _list_folder_singleflight(owner: str, repo: str, branch: str, folder: str, token: str) -> Future:
+    """동일한 list_folder 호출이 동시에 여러 번 나가면 하나의 HTTP 요청을 공유."""
+    inflight, lock = _list_folder_inflight()
+    key = (owner, repo, branch, folder)
+    with lock:
+        fut = inflight.get(key)
+        if fut is None:
+            fut = _gh_submit(list_folder, owner, repo, branch, folder, token)
+            inflight[key] = fut
+            fut.add_done_callback(lambda _f: inflight.pop(key, None))
+    return fut
+
+@st.cache_data(ttl=60, show_spinner=False, hash_funcs=_SECRET_SAFE_HASH)
+def list_json_files(owner: str, repo: str, branch: str, folders: Tuple[str, ...], token: str) -> List[dict]:
+    """여러 폴더의 .json 파일을 한 번에 모아 이름순으로. (경로 기준 중복 제거)"""
+    seen = {}
+    def _collect(folder: str, fut: Future):
+        try:
+            items = fut.result()
+            for it in items:
+                if it.get("type") == "file" and str(it.get("name","")).lower().endswith(".json"):
+                    key = it.get("path")
+                    seen[key] = {
+                        "name": it.get("name"),
+                        "path": it.get("path"),
+                        "size": it.get("size", 0),
+                        "sha": it.get("sha"),
+                        "folder": folder,
+                    }
+        except Exception:
+            pass
+    futs = [_list_folder_singleflight(owner, repo, branch, f, token) for f in folders]
+    for f, fut in zip(folders, futs):
+        _collect(f, fut)
+    rows = list(seen.values())
+    rows.sort(key=lambda x: x["name"].casefold())
+    return rows
+
+def delete_file(owner: str, repo: str, branch: str, path: str, token: str, message: str, sha: Optional[str] = None) -> dict:
+    # 호출자가 sha를 이미 알고 있으면(list_folder 결과 등) 사전 GET 생략
+    known = sha is not None
+    if not known:
+        sha, _ = get_file_sha_if_exists(owner, repo, branch, path, token)
     if not sha:
         return {"status": "not_found"}
-    url = f"{gh_api_base(owner, repo)}/contents/{path}"
+    url = gh_contents_url(owner, repo, path)
     payload = {"message": message, "sha": sha, "branch": branch}
-    r = requests.delete(url, headers=gh_headers(token), json=payload, timeout=30, **request_kwargs())
+    r = _GH_SESSION.delete(url, headers=gh_headers(token), json=payload, timeout=30)
+    if r.status_code in (404, 409) and known:
+        # 캐시된 sha가 오래된 경우: 최신 sha로 한 번만 다시 시도
+        return delete_file(owner, repo, branch, path, token, message)
     if r.status_code == 200:
+        _invalidate_gh_caches()
         return r.json()
     else:
         raise RuntimeError(f"GitHub DELETE failed: {r.status_code} {r.text}")
 
+GH_GRAPHQL_URL = "https://api.github.com/graphql"
+_CREATE_COMMIT_MUTATION = """
+mutation($input: CreateCommitOnBranchInput!) {
+  createCommitOnBranch(input: $input) { commit { oid url } }
+}
+"""
+
+def gh_commit_batch(owner: str, repo: str, branch: str, additions: List[Tuple[str, bytes]],
+                    message: str, token: str) -> dict:
+    """여러 파일 추가를 GraphQL createCommitOnBranch 한 번(커밋 1개)으로 처리."""
+    variables = {"input": {
+        "branch": {"repositoryNameWithOwner": f"{owner}/{repo}", "branchName": branch},
+        "message": {"headline": message},
+        "expectedHeadOid": _gh_branch_head(owner, repo, branch, token),
+        "fileChanges": {"additions": [{"path": p, "contents": _b64encode_str(c)} for p, c in additions]},
+    }}
+    r = _GH_SESSION.post(GH_GRAPHQL_URL, headers=gh_headers(token), timeout=120,
+                         json={"query": _CREATE_COMMIT_MUTATION, "variables": variables})
+    data = r.json() if r.status_code == 200 else None
+    if not data or data.get("errors"):
+        raise RuntimeError(f"GitHub GraphQL commit failed: {r.status_code} {r.text}")
+    _invalidate_gh_caches()
+    return data["data"]["createCommitOnBranch"]["commit"]
+
 def get_raw_file_bytes(owner: str, repo: str, branch: str, path: str, token: str, sha: Optional[str] = None) -> bytes:
-    headers = gh_headers(token).copy()
-    headers["Accept"] = "application/vnd.github.raw"
-    url = f"{gh_api_base(owner, repo)}/contents/{path}"
-    r = requests.get(url, params={"ref": branch}, headers=headers, timeout=60, **request_kwargs())
-    if r.status_code == 200:
-        return r.content
+    # blob sha는 내용 주소이므로 한 번 받은 본문은 요청 없이 그대로 재사용
+    if sha:
+        hit = _body_cache_get(f"blob:{sha}")
+        if hit is not None:
+            return hit[1]
+        body = _get_raw_file_bytes(owner, repo, branch, path, token, sha)
+        if git_blob_sha(body) == sha:
+            _body_cache_put(f"blob:{sha}", None, body, len(body))
+        return body
+    return _get_raw_file_bytes(owner, repo, branch, path, token, sha)
+
+def _get_raw_file_bytes(owner: str, repo: str, branch: str, path: str, token: str, sha: Optional[str]) -> bytes:
+    # 공개 리포: raw.githubusercontent.com CDN (REST 쿼터 미소모, 인증 불필요).
+    # CDN은 수 분간 캐시하므로 목록의 sha와 본문 blob sha가 일치할 때만 채택
+    if sha and not repo_is_private(owner, repo, token):
+        try:
+            r0 = _GH_SESSION.get(f"{gh_raw_base(owner, repo, branch)}/{urllib.parse.quote(path)}", timeout=60)
+            if r0.status_code == 200 and git_blob_sha(r0.content) == sha:
+                return r0.content
+        except requests.RequestException:
+            pass
+    url = gh_contents_url(owner, repo, path)
+    r, body = _gh_get_cached(url, gh_raw_headers(token), params={"ref": branch}, timeout=60, raw=True)
+    if body is not None:
+        return body
     if sha:
-        headers2 = gh_headers(token).copy()
-        headers2["Accept"] = "application/vnd.github.raw"
         url2 = f"{gh_api_base(owner, repo)}/git/blobs/{sha}"
-        r2 = requests.get(url2, headers=headers2, timeout=60, **request_kwargs())
+        r2 = _GH_SESSION.get(url2, headers=gh_raw_headers(token), timeout=60)
         if r2.status_code == 200:
             return r2.content
     raise RuntimeError(f"GitHub download failed: {r.status_code} {r.text}")
 
+@st.cache_data(ttl=600, show_spinner=False, hash_funcs=_SECRET_SAFE_HASH)
 def repo_is_private(owner: str, repo: str, token: str) -> bool:
-    cache_key = f"{owner}/{repo}"
-    if "_repo_visibility_cache" not in st.session_state:
-        st.session_state._repo_visibility_cache = {}
-    cache = st.session_state._repo_visibility_cache
-    if cache_key in cache:
-        return cache[cache_key]
     url = gh_api_base(owner, repo)
-    r = requests.get(url, headers=gh_headers(token), timeout=30, **request_kwargs())
-    if r.status_code == 200:
-        priv = bool(r.json().get("private", False))
-        cache[cache_key] = priv
-        return priv
-    cache[cache_key] = True
+    r, data = _gh_get_cached(url, gh_headers(token), timeout=30)
+    if data is not None:
+        return bool(data.get("private", False))
     return True
 
-def build_data_uri(content_bytes: bytes) -> str:
-    b64 = base64.b64encode(content_bytes).decode("ascii")
-    return f"data:application/octet-stream;base64,{b64}"
+# 확장자 → MIME (mimetypes 조회 없이 dict 한 번). 모르는 확장자는 octet-stream
+_MIME = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif",
+    ".webp": "image/webp", ".svg": "image/svg+xml", ".pdf": "application/pdf",
+    ".txt": "text/plain", ".md": "text/markdown", ".csv": "text/csv", ".json": "application/json",
+    ".zip": "application/zip", ".mp3": "audio/mpeg", ".mp4": "video/mp4",
+}
+
+def build_data_uri(content_bytes: bytes, ext: str = "") -> str:
+    mime = _MIME.get(ext.lower(), "application/octet-stream")
+    return f"data:{mime};base64,{_b64encode_str(content_bytes)}"
 
 # =============================
 # Utils
@@ -153,20 +529,43 @@ def build_data_uri(content_bytes: bytes) -> str:
 
 SnippetItem = Union[str, dict]
 
+_URLSAFE_TO_STD = str.maketrans("-_", "+/")
+
 def _b64decode_any(s: str) -> bytes:
-    s = s.strip()
-    pad = '=' * (-len(s) % 4)
-    try:
-        return base64.urlsafe_b64decode(s + pad)
-    except Exception:
-        return base64.b64decode(s + pad)
+    """표준/URL-safe 어느 쪽이든 한 번에 디코드 (-_ 를 +/ 로 바꾼 뒤 표준 디코드)."""
+    s = s.strip().translate(_URLSAFE_TO_STD)
+    return _b64.b64decode(s + '=' * (-len(s) % 4))
+
+def _json_dumps_bytes(obj: Any, compact: bool = False) -> bytes:
+    """UTF-8 JSON 바이트 (indent=2, 비ASCII 그대로). compact=True면 공백 없이. orjson이 있으면 사용."""
+    if orjson is not None:
+        return orjson.dumps(obj) if compact else orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    if compact:
+        return _json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except Exception:
+            pass  # 잘못된 UTF-8 등은 아래에서 관대하게 처리
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    return _json.loads(data)
 
 # =============================
 # Snippet helpers (③ Text Snippet)
 # =============================
 
+_SNIPPET_KEYS = frozenset(("t", "hint"))
+
 def _normalize_snippet_item(x: SnippetItem) -> dict:
     if isinstance(x, dict):
+        # 이미 정규화된 형태면 새 dict를 만들지 않고 그대로 반환
+        if (isinstance(x.get("t"), str) and x.keys() <= _SNIPPET_KEYS
+                and ("hint" not in x or (isinstance(x["hint"], str) and x["hint"]))):
+            return x
         t = str(x.get("t", ""))
         hint = x.get("hint")
         obj = {"t": t}
@@ -175,26 +574,35 @@ def _normalize_snippet_item(x: SnippetItem) -> dict:
         return obj
     return {"t": str(x)}
 
-def load_snippets(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[List[dict], Optional[str]]:
-    sha, info = get_file_sha_if_exists(owner, repo, branch, path, token)
-    if info and info.get("content"):
+def _read_snippets(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[List[dict], Optional[str]]:
+    sha, raw = get_file_raw_and_sha(owner, repo, branch, path, token)
+    if raw:
         try:
-            decoded = base64.b64decode(info["content"]).decode("utf-8", errors="replace")
-            data = _json.loads(decoded)
+            data = _json_loads(raw)
             if isinstance(data, list):
                 return [_normalize_snippet_item(x) for x in data], sha
         except Exception:
             pass
     return [], sha
 
-def save_snippets(owner: str, repo: str, branch: str, path: str, token: str, snippets: List[dict], sha: Optional[str]) -> Optional[str]:
-    body = _json.dumps([_normalize_snippet_item(x) for x in snippets], ensure_ascii=False, indent=2).encode("utf-8")
+@st.cache_data(ttl=15, show_spinner=False, hash_funcs=_SECRET_SAFE_HASH)
+def load_snippets(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[List[dict], Optional[str]]:
+    return _read_snippets(owner, repo, branch, path, token)
+
+def save_snippets(owner: str, repo: str, branch: str, path: str, token: str, snippets: List[dict], sha: Optional[str],
+                  already_normalized: bool = False) -> Optional[str]:
+    items = snippets if already_normalized else [_normalize_snippet_item(x) for x in snippets]
+    body = _json_dumps_bytes(items, compact=True)   # 앱이 관리하는 파일이므로 들여쓰기 없이
     resp = put_file(owner, repo, branch, path, body, token, "Update snippets", sha)
     try:
         return (resp.get("content") or {}).get("sha")
     except Exception:
         return None
 
+def snippets_for_write(owner: str, repo: str, branch: str, path: str, token: str) -> Tuple[List[dict], Optional[str]]:
+    """쓰기 직전의 (목록, sha). 순서 변경은 별도 세션(iframe)에서도 일어나므로 캐시 없이 다시 읽음 (변경 없으면 ETag 304)."""
+    return _read_snippets(owner, repo, branch, path, token)
+
 # =============================
 # UI shell
 # =============================
@@ -244,6 +652,8 @@ st.markdown(
       .rowctl-marker + div[data-testid="stHorizontalBlock"] button{
         min-width:32px !important; padding:.15rem .35rem !important;
       }
+      /* 플레이리스트 드래그 정렬이 누르는 숨은 버튼 */
+      .st-key-pl_reorder_apply{ display:none !important; }
     </style>
     """,
     unsafe_allow_html=True,
@@ -253,60 +663,62 @@ st.markdown(
 # State & Settings
 # =============================
 
-def _init_state():
-    ss = st.session_state
-    if "gh_owner" not in ss: ss.gh_owner = st.secrets.get("GH_OWNER", "")
-    if "gh_repo" not in ss: ss.gh_repo = st.secrets.get("GH_REPO", "")
-    if "gh_branch" not in ss: ss.gh_branch = st.secrets.get("GH_BRANCH", "main")
-    if "folder" not in ss:
-        default_folder = st.secrets.get(
-            "DEFAULT_FOLDER",
-            path_join("my-blackhole", st.secrets.get("DEVICE", "desktop"))
-        )
-        ss.folder = ensure_folder_path(default_folder)
-    if "memo_area" not in ss: ss.memo_area = ""
-    if "uploader_key" not in ss: ss.uploader_key = 0
-
-    if "memo_folder" not in ss:
-        ss.memo_folder = ensure_folder_path(
-            st.secrets.get("MEMO_FOLDER", path_join("my-blackhole", "_memo"))
-        )
-    if "snippet_folder" not in ss:
-        ss.snippet_folder = ensure_folder_path(
-            st.secrets.get("SNIPPET_FOLDER", path_join("my-blackhole", "_snippets"))
-        )
-    if "playlist_folder" not in ss:
-        ss.playlist_folder = ensure_folder_path(
-            st.secrets.get("PLAYLIST_FOLDER", path_join("my-blackhole", "_playlists"))
-        )
+# 세션 기본값. secrets에 의존하거나 매 세션 새 객체가 필요한 값은 callable로 지연 평가
+_STATE_DEFAULTS: Dict[str, Any] = {
+    "gh_owner": lambda: st.secrets.get("GH_OWNER", ""),
+    "gh_repo": lambda: st.secrets.get("GH_REPO", ""),
+    "gh_branch": lambda: st.secrets.get("GH_BRANCH", "main"),
+    "folder": lambda: ensure_folder_path(st.secrets.get(
+        "DEFAULT_FOLDER",
+        path_join("my-blackhole", st.secrets.get("DEVICE", "desktop"))
+    )),
+    "memo_area": "",
+    "uploader_key": 0,
+
+    "memo_folder": lambda: ensure_folder_path(
+        st.secrets.get("MEMO_FOLDER", path_join("my-blackhole", "_memo"))
+    ),
+    "snippet_folder": lambda: ensure_folder_path(
+        st.secrets.get("SNIPPET_FOLDER", path_join("my-blackhole", "_snippets"))
+    ),
+    "playlist_folder": lambda: ensure_folder_path(
+        st.secrets.get("PLAYLIST_FOLDER", path_join("my-blackhole", "_playlists"))
+    ),
 
     # 메모리 절약: 기본값 0MB => Data URL 비활성
-    if "inline_dl_limit_mb" not in ss:
-        ss.inline_dl_limit_mb = float(st.secrets.get("INLINE_DL_LIMIT_MB", 0))
+    "inline_dl_limit_mb": lambda: float(st.secrets.get("INLINE_DL_LIMIT_MB", 0)),
 
-    if "_snippets_loaded" not in ss: ss._snippets_loaded = False
-    if "snippets" not in ss: ss.snippets = []
-    if "_snip_sha" not in ss: ss._snip_sha = None
-    if "_snip_clear" not in ss: ss._snip_clear = False
+    "_snippets_loaded": False,
+    "snippets": list,
+    "_snip_clear": False,
 
-    if "_memo_autoloaded" not in ss: ss._memo_autoloaded = False
+    "_memo_autoloaded": False,
+    "_memo_sha": None,
 
     # 노동요 탭 임시 상태
-    if "_show_add_to_other" not in ss: ss._show_add_to_other = False
-    if "_pending_track" not in ss: ss._pending_track = None
-    if "_show_save_prompt" not in ss: ss._show_save_prompt = False
+    "_show_add_to_other": False,
+    "_pending_track": None,
+    "_show_save_prompt": False,
 
     # 현재 플레이리스트 메타
-    if "playlist_name" not in ss: ss.playlist_name = "새 플레이리스트"
-    if "playlist_path" not in ss: ss.playlist_path = None
+    "playlist_name": "새 플레이리스트",
+    "playlist_path": None,
 
     # 플레이어 상태
-    if "playlist" not in ss: ss.playlist = []
-    if "current_index" not in ss: ss.current_index = 0
-    if "is_playing" not in ss: ss.is_playing = False
-    if "play_start_ts" not in ss: ss.play_start_ts = None
-    if "elapsed_acc" not in ss: ss.elapsed_acc = 0.0
-    if "audio_nonce" not in ss: ss.audio_nonce = 0
+    "playlist": list,
+    "playlist_version": 0,   # 플레이리스트가 바뀔 때마다 +1 (누적 길이 캐시 무효화용)
+    "current_index": 0,
+    "is_playing": False,
+    "play_start_ts": None,
+    "elapsed_acc": 0.0,
+    "audio_nonce": 0,
+}
+
+def _init_state():
+    ss = st.session_state
+    for k, v in _STATE_DEFAULTS.items():
+        if k not in ss:
+            ss[k] = v() if callable(v) else v
 
 _init_state()
 
@@ -355,96 +767,95 @@ ready = bool(token and owner and repo and branch)
 # =============================
 # URL query handlers (파일/스니펫)
 # =============================
-try:
-    qs = st.query_params
+def _handle_del(enc: str) -> None:
+    try:
+        rel_path = _b64.urlsafe_b64decode(enc).decode("utf-8")
+        # sha는 (캐시된) 폴더 목록에서 얻어 별도 GET을 생략
+        items = _list_folder_singleflight(owner, repo, branch, os.path.dirname(rel_path), token).result()
+        known_sha = next((it.get("sha") for it in items if it.get("path") == rel_path), None)
+        delete_file(owner, repo, branch, rel_path, token, "Delete via My Blackhole", sha=known_sha)
+        st.toast(f"삭제됨: {os.path.basename(rel_path)}")
+    except Exception as e:
+        st.error(f"삭제 실패: {e}")
+    finally:
+        st.rerun()
 
-    enc_val = qs.get("del", None)
-    if enc_val and ready:
-        enc = enc_val[0] if isinstance(enc_val, list) else enc_val
-        if enc:
-            try:
-                rel_path = base64.urlsafe_b64decode(enc.encode("ascii")).decode("utf-8")
-                delete_file(owner, repo, branch, rel_path, token, "Delete via My Blackhole")
-                st.toast(f"삭제됨: {os.path.basename(rel_path)}")
-            except Exception as e:
-                st.error(f"삭제 실패: {e}")
-            finally:
-                try:
-                    if "del" in st.query_params: del st.query_params["del"]
-                    if "ts"  in st.query_params: del st.query_params["ts"]
-                except Exception:
-                    pass
-                st.rerun()
-
-    del_snip = qs.get("snip_del", None)
-    if del_snip and ready:
-        idx_str = del_snip[0] if isinstance(del_snip, list) else del_snip
-        try:
-            idx = int(idx_str)
+def _handle_snip_reorder(payload: str) -> None:
+    try:
+        arr = _json_loads(_b64decode_any(payload))
+        if isinstance(arr, list):
+            normalized = [_normalize_snippet_item(x) for x in arr]
             snippet_folder = ensure_folder_path(st.session_state.snippet_folder)
             snippet_path = path_join(snippet_folder, "snippets.json")
-            current, sha = load_snippets(owner, repo, branch, snippet_path, token)
-            if 0 <= idx < len(current):
-                current.pop(idx)
-                new_sha = save_snippets(owner, repo, branch, snippet_path, token, current, sha)
-                st.session_state.snippets = current
-                st.session_state._snip_sha = new_sha
-            st.toast("스니펫 삭제됨")
-        except Exception as e:
-            st.error(f"스니펫 삭제 실패: {e}")
-        finally:
-            try:
-                if "snip_del" in st.query_params: del st.query_params["snip_del"]
-                if "ts" in st.query_params: del st.query_params["ts"]
-            except Exception:
-                pass
-            st.rerun()
-
-    snip_reorder = qs.get("snip_reorder", None)
-    if snip_reorder and ready:
-        payload = snip_reorder[0] if isinstance(snip_reorder, list) else snip_reorder
-        try:
-            raw = _b64decode_any(payload).decode("utf-8", errors="replace")
-            arr = _json.loads(raw)
-            if isinstance(arr, list):
-                normalized = [_normalize_snippet_item(x) for x in arr]
-                snippet_folder = ensure_folder_path(st.session_state.snippet_folder)
-                snippet_path = path_join(snippet_folder, "snippets.json")
-                current, sha = load_snippets(owner, repo, branch, snippet_path, token)
-                new_sha = save_snippets(owner, repo, branch, snippet_path, token, normalized, sha)
-                st.session_state.snippets = normalized
-                st.session_state._snip_sha = new_sha
-                st.toast("스니펫 순서 저장 완료")
-        except Exception as e:
-            st.error(f"스니펫 순서 저장 실패: {e}")
-        finally:
-            try:
-                if "snip_reorder" in st.query_params: del st.query_params["snip_reorder"]
-                if "ts" in st.query_params: del st.query_params["ts"]
-            except Exception:
-                pass
-            st.rerun()
-except Exception:
-    pass
+            _, sha = snippets_for_write(owner, repo, branch, snippet_path, token)
+            save_snippets(owner, repo, branch, snippet_path, token, normalized, sha, already_normalized=True)
+            st.session_state.snippets = normalized
+            st.toast("스니펫 순서 저장 완료")
+    except Exception as e:
+        st.session_state._snippets_loaded = False
+        st.error(f"스니펫 순서 저장 실패: {e}")
+    finally:
+        st.rerun()
+
+# 키 → 처리 함수. 각 처리는 끝에 st.rerun() 하므로 한 번에 하나만 실행됨
+_QP_HANDLERS = {"del": _handle_del, "snip_reorder": _handle_snip_reorder}
+
+def _take_query_actions() -> Dict[str, str]:
+    """처리할 URL 액션을 한 번에 읽고 URL에서 지운다 (ts 포함) — 다음 rerun에서 같은 액션이 반복되지 않게."""
+    qp = st.query_params
+    actions = {k: qp.get(k) for k in _QP_HANDLERS if k in qp}
+    for k in (*actions, "ts"):
+        if k in qp:
+            del qp[k]
+    return actions
+
+if ready:
+    try:
+        qs = _take_query_actions()
+        if qs:
+            # 쓰기와 무관한 조회는 미리 병렬로 데워 두어 rerun 후 렌더링이 캐시를 타게 함
+            _gh_submit(repo_is_private, owner, repo, token)
+        for k, v in qs.items():
+            if v:
+                _QP_HANDLERS[k](v)
+    except Exception:
+        pass
 
 # =============================
 # (신규) 노동요 탭: YouTube 오디오 (비디오 숨김) + 플레이리스트
 # =============================
 
-YOUTUBE_ID_PATTERNS = [
-    r"(?:https?://)?(?:www\.)?youtu\.be/([A-Za-z0-9_\-]{11})",
-    r"(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([A-Za-z0-9_\-]{11})",
-    r"(?:https?://)?(?:www\.)?youtube\.com/.*[?&]v=([A-Za-z0-9_\-]{11})",
-    r"^([A-Za-z0-9_\-]{11})$",
-]
+# youtu.be/ID · youtube.com/…?v=ID · youtube.com/(v|e|embed|shorts|live)/ID 를 한 번의 search로
+_YT_RX = re.compile(r"(?:youtu\.be/|youtube\.com/(?:.*?[?&]v=|(?:v|e|embed|shorts|live)/))([A-Za-z0-9_\-]{11})")
+_YT_BARE_ID_RX = re.compile(r"[A-Za-z0-9_\-]{11}")
+
+def _extract_video_id(s: str) -> Optional[str]:
+    if len(s) == 11 and _YT_BARE_ID_RX.fullmatch(s):
+        return s
+    # 흔한 형태(youtu.be/…, youtube.com/watch?v=…)는 urlparse로 바로 추출, 나머지만 정규식
+    try:
+        u = urllib.parse.urlparse(s)
+    except ValueError:
+        u = None
+    if u is not None and u.netloc:
+        host = u.netloc.lower()
+        cand = None
+        if host.endswith("youtu.be"):
+            cand = u.path.lstrip("/")[:11]
+        elif host.endswith("youtube.com"):
+            cand = (urllib.parse.parse_qs(u.query).get("v") or [""])[0][:11]
+        if cand and _YT_BARE_ID_RX.fullmatch(cand):
+            return cand
+    m = _YT_RX.search(s)
+    return m.group(1) if m else None
+
+@st.cache_resource(show_spinner=False)
+def _video_id_lru():
+    """스크립트가 rerun마다 다시 실행되므로 LRU는 cache_resource에 보관해 세션 간 재사용."""
+    return functools.lru_cache(maxsize=256)(_extract_video_id)
 
 def extract_video_id(url_or_id: str) -> Optional[str]:
-    s = url_or_id.strip()
-    for p in YOUTUBE_ID_PATTERNS:
-        m = re.search(p, s)
-        if m:
-            return m.group(1)
-    return None
+    return _video_id_lru()(url_or_id.strip())
 
 def format_duration(seconds: Optional[int]) -> str:
     if seconds is None or seconds < 0:
@@ -457,13 +868,16 @@ def format_duration(seconds: Optional[int]) -> str:
         return f"{h:d}:{m:02d}:{s:02d}"
     return f"{m:d}:{s:02d}"
 
-@dataclass
+@dataclass(slots=True)
 class Track:
     video_id: str
     title: str
     duration: Optional[int]          # None이면 모름
     thumbnail_url: str
 
+def _default_thumbnail(video_id: str) -> str:
+    return f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+
 # ---- 메타데이터 조회 (서버에서만, 스트림 추출 X) ----
 @st.cache_data(ttl=24*3600, show_spinner=False)
 def _yt_oembed(video_id: str) -> Optional[dict]:
@@ -471,70 +885,212 @@ def _yt_oembed(video_id: str) -> Optional[dict]:
     url = "https://www.youtube.com/oembed"
     params = {"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"}
     try:
-        r = requests.get(url, params=params, timeout=10, **request_kwargs())
+        r = _GH_SESSION.get(url, params=params, timeout=10)
         if r.status_code == 200:
             return r.json()
     except Exception:
         pass
     return None
 
-@st.cache_data(ttl=24*3600, show_spinner=False)
+# 메타데이터만 필요: HLS/DASH 매니페스트와 번역 자막 조회는 건너뜀 (player JS 캐시는 yt-dlp 기본 cachedir 사용)
+_YTDLP_OPTS = {
+    "quiet": True, "skip_download": True, "no_warnings": True, "noplaylist": True,
+    "extractor_args": {"youtube": {"skip": ["hls", "dash", "translated_subs"]}},
+}
+
+def _meta_by_ytdlp(video_id: str) -> Optional[dict]:
+    try:
+        with ytdlp.YoutubeDL(dict(_YTDLP_OPTS)) as ydl:   # YoutubeDL이 params를 고칠 수 있어 복사본
+            # process=False: 제목/길이만 필요하므로 포맷 선택·URL 처리(process_ie_result) 단계는 건너뜀
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False, process=False)
+    except Exception:
+        return None
+    if not info:
+        return None
+    duration = info.get("duration")
+    return {"title": info.get("title") or f"Video {video_id}",
+            "duration": int(duration) if duration else None,
+            "thumbnail_url": info.get("thumbnail") or _default_thumbnail(video_id)}
+
+def _meta_by_pytube(video_id: str) -> Optional[dict]:
+    try:
+        yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
+        duration = getattr(yt, "length", None)
+        return {"title": yt.title, "duration": int(duration) if duration else None,
+                "thumbnail_url": yt.thumbnail_url or _default_thumbnail(video_id)}
+    except Exception:
+        return None
+
+@st.cache_resource(show_spinner=False)
+def _meta_race_pool() -> ThreadPoolExecutor:
+    """yt-dlp/pytube 동시 조회용. _meta_pool 작업이 여기서 기다리므로 풀을 따로 둠 (교착 방지)."""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="ytrace")
+
+_META_MAX_AGE = 24 * 3600   # 디스크에 남긴 메타데이터의 유효 기간 (초)
+
+@st.cache_data(persist="disk", max_entries=2000, show_spinner=False)
+def _fetch_metadata(video_id: str) -> dict:
+    """제목/길이/썸네일 + 조회 시각 (dict). 길이까지 얻은 결과만 디스크에 남고, 아니면 LookupError."""
+    # yt-dlp와 pytube가 둘 다 있으면 동시에 시작해 먼저 길이까지 얻은 쪽을 사용 (느린 쪽은 버림)
+    fns = [fn for fn, lib in ((_meta_by_ytdlp, ytdlp), (_meta_by_pytube, YouTube)) if lib is not None]
+    if len(fns) == 1:
+        results = [fns[0](video_id)]
+    else:
+        results = (fut.result() for fut in as_completed([_meta_race_pool().submit(fn, video_id) for fn in fns]))
+    for m in results:
+        if m and m.get("duration") is not None:
+            return {**m, "fetched_at": time.time()}
+    raise LookupError(video_id)   # 실패/불완전한 결과는 캐시되지 않도록 예외로
+
+@st.cache_data(ttl=600, show_spinner=False)
 def get_metadata_only(video_id: str) -> Optional[Track]:
-    """가능하면 길이까지, 아니면 제목/썸네일만."""
-    # 1) yt-dlp가 있으면 duration까지 시도
-    if ytdlp is not None:
-        try:
-            with ytdlp.YoutubeDL({
-                "quiet": True, "skip_download": True, "no_warnings": True,
-                "format": "bestaudio/best", "noplaylist": True, "extract_flat": False
-            }) as ydl:
-                info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
-                if info:
-                    title = info.get("title") or f"Video {video_id}"
-                    duration = info.get("duration")
-                    thumb = info.get("thumbnail") or f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
-                    return Track(video_id, title, int(duration) if duration else None, thumb)
-        except Exception:
-            pass
-    # 2) pytube 길이 시도
-    if YouTube is not None:
+    """가능하면 길이까지, 아니면 oEmbed로 제목/썸네일만. 불완전한 결과와 실패(None)는 메모리에서 10분만 기억."""
+    try:
+        m = _fetch_metadata(video_id)
+        if time.time() - m.get("fetched_at", 0) > _META_MAX_AGE:
+            _fetch_metadata.clear(video_id)   # 24시간 지난 항목은 디스크에서 지우고 다시 조회
+            m = _fetch_metadata(video_id)
+    except LookupError:
+        meta = _yt_oembed(video_id)
+        if not meta:
+            return None
+        return Track(video_id, meta.get("title") or f"Video {video_id}", None,
+                     meta.get("thumbnail_url") or _default_thumbnail(video_id))
+    return Track(video_id, m["title"], m["duration"], m["thumbnail_url"])
+
+@st.cache_resource(show_spinner=False)
+def _meta_pool() -> ThreadPoolExecutor:
+    """yt-dlp/pytube 메타데이터 조회용 (GitHub 풀과 분리해 서로 막지 않게)."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="ytmeta")
+
+def _tracks_missing_duration(tracks: List[Track], start: int = 0, n: Optional[int] = None) -> List[Track]:
+    if ytdlp is None and YouTube is None:
+        return []  # oEmbed만 가능하면 길이를 얻을 수 없음
+    return [t for t in tracks[start:None if n is None else start + n] if t.duration is None]
+
+PLAYLIST_PREFETCH_N = 3   # 불러올 때 길이를 미리 채우는 곡 수 (현재 곡부터)
+
+def prefetch_tracks(tracks: List[Track], start: int = 0, n: Optional[int] = None) -> bool:
+    """길이를 모르는 트랙의 메타데이터를 병렬 조회해 duration을 채움. 하나라도 채웠으면 True."""
+    targets = _tracks_missing_duration(tracks, start, n)
+    if not targets:
+        return False
+    pool = _meta_pool()
+    futs = [_submit_with_ctx(pool, get_metadata_only, t.video_id) for t in targets]
+    changed = False
+    for t, fut in zip(targets, futs):
         try:
-            yt = YouTube(f"https://www.youtube.com/watch?v={video_id}")
-            title = yt.title
-            duration = getattr(yt, "length", None)
-            thumb = yt.thumbnail_url or f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
-            return Track(video_id, title, int(duration) if duration else None, thumb)
+            meta = fut.result()
         except Exception:
-            pass
-    # 3) oEmbed (제목/썸네일만, duration None)
-    meta = _yt_oembed(video_id)
-    if meta:
-        return Track(video_id, meta.get("title") or f"Video {video_id}",
-                     None, meta.get("thumbnail_url") or f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg")
-    return None
+            continue
+        if meta and meta.duration:
+            t.duration = meta.duration
+            changed = True
+    return changed
+
+def warm_next_track(tracks: List[Track], idx: int) -> None:
+    """재생 중에 다음 곡 메타데이터를 백그라운드로 미리 조회 (기다리지 않음)."""
+    for t in _tracks_missing_duration(tracks, idx + 1, 1):
+        _submit_with_ctx(_meta_pool(), get_metadata_only, t.video_id)
+
+def _client_position() -> Optional[float]:
+    """헤더 플레이어가 URL(pos=nonce:초)에 남긴 실제 재생 위치. 지금 재생 세션 것이 아니면 None."""
+    nonce, _, secs = str(st.query_params.get("pos", "")).partition(":")
+    if nonce != str(st.session_state.get("audio_nonce", 0)):
+        return None
+    try:
+        return max(0.0, float(secs))
+    except ValueError:
+        return None
 
 def _elapsed_now() -> float:
+    if st.session_state.get("is_playing", False):
+        pos = _client_position()   # 오디오가 기준 — 서버 계산은 JS가 아직 못 알려 줬을 때만
+        if pos is not None:
+            return pos
     e = float(st.session_state.get("elapsed_acc", 0.0))
     ps = st.session_state.get("play_start_ts", None)
     if st.session_state.get("is_playing", False) and ps is not None:
         e += time.time() - ps
     return max(0.0, e)
 
+_track_duration = attrgetter("duration")
+
+def _bump_playlist_version():
+    st.session_state.playlist_version = st.session_state.get("playlist_version", 0) + 1
+
+def _playlist_prefix(tracks: List[Track]) -> Tuple[array, bool]:
+    """(cum, all_known) — cum[i] = sum(durations[:i]). playlist_version이 바뀔 때만 다시 계산."""
+    key = (st.session_state.get("playlist_version", 0), id(tracks), len(tracks))
+    cached = st.session_state.get("_cum_durations")
+    if cached is None or cached[0] != key:
+        durs = list(map(_track_duration, tracks))
+        known = None not in durs
+        # duration은 생성 시점에 int|None으로 맞춰 두므로 int() 변환 없이 C 레벨 누적합
+        cum = array("q", accumulate(durs if known else [d or 0 for d in durs], initial=0))
+        cached = (key, cum, known)
+        st.session_state._cum_durations = cached
+    return cached[1], cached[2]
+
 def _playlist_total_secs(tracks: List[Track]) -> Optional[int]:
-    vals = [t.duration for t in tracks if t.duration is not None]
     if not tracks: return 0
-    if len(vals) != len(tracks):     # 하나라도 모르면 총 길이 미상
+    cum, known = _playlist_prefix(tracks)
+    if not known:     # 하나라도 모르면 총 길이 미상
         return None
-    return sum(int(x) for x in vals)
+    return cum[-1]
 
 def _sum_before_index(tracks: List[Track], idx: int) -> int:
-    cut = max(0, min(idx, len(tracks)))
-    return sum(int(t.duration or 0) for t in tracks[:cut])
+    cum, _ = _playlist_prefix(tracks)
+    return cum[max(0, min(idx, len(tracks)))]
+
+def _playlist_row_html(i: int, tr: Track, active: bool = False) -> str:
+    title = f"{i+1}. {_html.escape(tr.title)}"
+    if active:
+        title += " <span class='np'>Now Playing</span>"
+        meta = (f"ID: {tr.video_id} · <span id='row-elapsed'>0:00</span> / "
+                f"<span id='row-total'>{format_duration(tr.duration)}</span>")
+    else:
+        meta = f"ID: {tr.video_id} · 0:00 / {format_duration(tr.duration)}"
+    return (f"<tr draggable='true' data-idx='{i}'><td class='th'><img src='{_html.escape(tr.thumbnail_url, quote=True)}' loading='lazy' alt=''></td>"
+            f"<td><div class='t'>{title}</div><div class='m'>{meta}</div></td></tr>")
+
+def _apply_playlist_reorder() -> None:
+    """표에서 드래그한 순서(?pl_reorder=버전.i,j,k…)를 반영. 버전이 다르거나 순열이 아니면 무시."""
+    raw = st.query_params.get("pl_reorder")
+    if not raw:
+        return
+    del st.query_params["pl_reorder"]
+    ver, _, order_s = raw.partition(".")
+    pl = st.session_state.playlist
+    try:
+        order = [int(x) for x in order_s.split(",")]
+    except ValueError:
+        return
+    if ver != str(st.session_state.get("playlist_version", 0)) or sorted(order) != list(range(len(pl))):
+        return
+    if order == sorted(order):
+        return
+    pl[:] = [pl[i] for i in order]
+    st.session_state.current_index = order.index(st.session_state.current_index) if pl else 0
+    _bump_playlist_version()
+
+def _playlist_rows_html(tracks: List[Track]) -> List[str]:
+    """정적 행 HTML 목록 — playlist_version이 바뀔 때만 다시 만든다."""
+    key = (st.session_state.get("playlist_version", 0), id(tracks), len(tracks))
+    cached = st.session_state.get("_pl_rows_html")
+    if cached is None or cached[0] != key:
+        cached = (key, [_playlist_row_html(i, tr) for i, tr in enumerate(tracks)])
+        st.session_state._pl_rows_html = cached
+    return cached[1]
 
 # ---------- 플레이리스트 저장/불러오기/삭제 유틸 ----------
 SAFE_FILENAME_RX = re.compile(r"[^0-9A-Za-z가-힣 _\-\.\(\)]+")
+_SAFE_ASCII_DEL = str.maketrans("", "", ascii_letters + digits + " _-.()")
 def _sanitize_filename(name: str) -> str:
-    s = SAFE_FILENAME_RX.sub("_", name.strip())
+    s = name.strip()
+    rest = s.translate(_SAFE_ASCII_DEL)  # 허용 ASCII를 지우고 남은 글자만 검사
+    if rest and not all("가" <= c <= "힣" for c in rest):
+        s = SAFE_FILENAME_RX.sub("_", s)
     s = s.strip(" ._")
     return s or "playlist"
 
@@ -552,12 +1108,14 @@ def _pl_path(folder: str, name: str) -> str:
     return path_join(folder, _sanitize_filename(name) + ".json")
 
 def _serialize_track(t: Track) -> Dict[str, Any]:
-    return {
+    d = {
         "video_id": t.video_id,
         "title": t.title,
         "duration": int(t.duration or 0),
-        "thumbnail_url": t.thumbnail_url,
     }
+    if t.thumbnail_url != _default_thumbnail(t.video_id):   # 기본 썸네일은 불러올 때 복원
+        d["thumbnail_url"] = t.thumbnail_url
+    return d
 
 def _deserialize_tracks(payload: Any) -> List[Track]:
     arr = []
@@ -571,7 +1129,7 @@ def _deserialize_tracks(payload: Any) -> List[Track]:
                     video_id=vid,
                     title=str(x.get("title", f"Video {vid}")),
                     duration=int(x.get("duration") or 0) or None,
-                    thumbnail_url=str(x.get("thumbnail_url") or f"https://i.ytimg.com/vi/{vid}/hqdefault.jpg"),
+                    thumbnail_url=str(x.get("thumbnail_url") or _default_thumbnail(vid)),
                 ))
             except Exception:
                 continue
@@ -594,7 +1152,7 @@ def save_current_playlist_to_repo(name: str) -> Tuple[bool, str]:
         "current_index": int(st.session_state.get("current_index", 0)),
         "tracks": [_serialize_track(t) for t in pl],
     }
-    body = _json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    body = _json_dumps_bytes(data, compact=True)
     sha, _ = get_file_sha_if_exists(owner, repo, branch, path, token)
     put_file(owner, repo, branch, path, body, token, f"Save playlist: {name}", sha)
     st.session_state.playlist_name = name
@@ -604,38 +1162,33 @@ def save_current_playlist_to_repo(name: str) -> Tuple[bool, str]:
 def list_saved_playlists() -> List[dict]:
     if not ready:
         return []
-    seen = {}
-    def _collect(folder: str):
-        try:
-            items = list_folder(owner, repo, branch, folder, token)
-            for it in items:
-                if it.get("type") == "file" and str(it.get("name","")).lower().endswith(".json"):
-                    key = it.get("path")
-                    seen[key] = {
-                        "name": it.get("name"),
-                        "path": it.get("path"),
-                        "size": it.get("size", 0),
-                        "sha": it.get("sha"),
-                        "folder": folder,
-                    }
-        except Exception:
-            pass
-    _collect(_pl_folder_primary())
-    for f in _pl_folder_legacy_candidates():
-        _collect(f)
-    rows = list(seen.values())
-    rows.sort(key=lambda x: x["name"].lower())
-    return rows
+    folders = (_pl_folder_primary(), *_pl_folder_legacy_candidates())
+    return list_json_files(owner, repo, branch, folders, token)
+
+def _fetch_playlist_json(path: str, sha: Optional[str] = None) -> Tuple[Optional[str], Any]:
+    """플레이리스트 JSON을 한 번 받아 한 번 파싱 → (sha, data). 파일이 없으면 (None, None)."""
+    if sha:
+        raw = get_raw_file_bytes(owner, repo, branch, path, token, sha=sha)
+    else:
+        sha, raw = get_file_raw_and_sha(owner, repo, branch, path, token)
+    if raw is None:
+        return None, None
+    return sha, _json_loads(raw)
 
-def load_playlist_from_repo(path: str) -> Tuple[bool, str]:
+def load_playlist_from_repo(path: str, sha: Optional[str] = None) -> Tuple[bool, str]:
     if not ready:
         return False, "GitHub 설정이 완료되지 않았습니다."
     try:
-        raw = get_raw_file_bytes(owner, repo, branch, path, token)
-        data = _json.loads(raw.decode("utf-8", errors="replace"))
+        _, data = _fetch_playlist_json(path, sha)
+        if data is None:
+            return False, f"불러오기 실패: {os.path.basename(path)} 없음"
         tracks = _deserialize_tracks(data)
+        cur = int(data.get("current_index", 0)) if tracks else 0
+        # 길이를 모르는 곡은 이미 yt-dlp/pytube가 실패한 곡이라 느림: 재생 위치부터 몇 곡만 기다리고 나머지는 재생 때 채움
+        prefetch_tracks(tracks, start=cur, n=PLAYLIST_PREFETCH_N)
         st.session_state.playlist = tracks
-        st.session_state.current_index = int(data.get("current_index", 0)) if tracks else 0
+        _bump_playlist_version()
+        st.session_state.current_index = cur
         st.session_state.elapsed_acc = 0.0
         st.session_state.play_start_ts = None
         st.session_state.is_playing = False
@@ -650,12 +1203,10 @@ def append_track_to_playlist_path(path: str, tr: Track) -> Tuple[bool, str]:
     if not ready:
         return False, "GitHub 설정이 완료되지 않았습니다."
     try:
-        sha, info = get_file_sha_if_exists(owner, repo, branch, path, token)
+        sha, data = _fetch_playlist_json(path)
         cur_tracks: List[Track] = []
         meta = {"name": os.path.splitext(os.path.basename(path))[0]}
-        if info and info.get("content"):
-            decoded = base64.b64decode(info["content"]).decode("utf-8", errors="replace")
-            data = _json.loads(decoded)
+        if data is not None:
             cur_tracks = _deserialize_tracks(data)
             if isinstance(data, dict) and "name" in data:
                 meta["name"] = data["name"]
@@ -665,29 +1216,24 @@ def append_track_to_playlist_path(path: str, tr: Track) -> Tuple[bool, str]:
             "updated": datetime.datetime.utcnow().isoformat() + "Z",
             "tracks": [_serialize_track(t) for t in cur_tracks]
         }
-        body = _json.dumps(body_obj, ensure_ascii=False, indent=2).encode("utf-8")
+        body = _json_dumps_bytes(body_obj, compact=True)
         put_file(owner, repo, branch, path, body, token, f"Append track to playlist: {meta['name']}", sha)
         return True, f"추가 완료: {meta['name']}"
     except Exception as e:
         return False, f"추가 실패: {e}"
 
-def delete_playlist_by_path(path: str) -> Tuple[bool, str]:
+def delete_playlist_by_path(path: str, sha: Optional[str] = None) -> Tuple[bool, str]:
     if not ready:
         return False, "GitHub 설정이 완료되지 않았습니다."
     try:
-        delete_file(owner, repo, branch, path, token, f"Delete playlist: {os.path.basename(path)}")
+        delete_file(owner, repo, branch, path, token, f"Delete playlist: {os.path.basename(path)}", sha=sha)
         return True, "삭제 완료"
     except Exception as e:
         return False, f"삭제 실패: {e}"
 
 # ---------- 숨김 YouTube 플레이어 + 타이머(헤더) ----------
-def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int, total_secs_opt: Optional[int], playing: bool):
-    """비디오는 숨기고 오디오만. 헤더 pill(전체 진행) 실시간 업데이트.
-       자동재생 정책 회피: 자동재생 시에는 항상 mute로 시작하고, 버튼 클릭 시 unMute."""
-    total_val = total_secs_opt if (total_secs_opt is not None) else 0
-    total_label = format_duration(total_secs_opt if total_secs_opt is not None else None)
-    init_label = f"{format_duration(before_secs + start_at)} / {total_label}"
-    tpl = Template("""
+# 템플릿은 모듈 로드 시 한 번만 만든다
+_HIDDEN_PLAYER_TPL = Template("""
     <style>
       .hdr-wrap{display:flex;justify-content:flex-end;align-items:center;gap:8px;}
       .pill{padding:4px 10px;border-radius:999px;background:#f3f4f6;font-size:12px;color:#111}
@@ -711,6 +1257,7 @@ def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int
         var before   = $beforeSecs;
         var total    = $totalSecs;
         var totalKnown = $totalKnown;
+        var nonce    = $nonce;
 
         function pad2(n){ return String(n).padStart(2,'0'); }
         function fmt(t) {
@@ -720,8 +1267,9 @@ def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int
           var s = Math.floor(t%60);
           return (h>0) ? (h + ":" + pad2(m) + ":" + pad2(s)) : (m + ":" + pad2(s));
         }
+        var pillEl = null, lastPill = '';
         function render(tLocal){
-          var pill = document.getElementById('hdr-pill');
+          var pill = pillEl || (pillEl = document.getElementById('hdr-pill'));
           // 총합 미상인 경우, 현재 플레이어의 길이로 보정
           var dynTotal = total;
           try{
@@ -731,7 +1279,9 @@ def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int
             }
           }catch(_){}
           var totalStr = (totalKnown || (dynTotal && isFinite(dynTotal) && dynTotal>0)) ? fmt(dynTotal) : "--:--";
-          if (pill) pill.textContent = fmt(before + tLocal) + " / " + totalStr;
+          // 표시는 초 단위라 틱 4번 중 3번은 같은 문자열 — 바뀔 때만 DOM에 씀
+          var txt = fmt(before + tLocal) + " / " + totalStr;
+          if (pill && txt !== lastPill) { pill.textContent = txt; lastPill = txt; }
         }
         function showTap(show){
           var t = document.getElementById('tap-btn');
@@ -814,15 +1364,129 @@ def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int
             }
           } catch(_) {}
           render(t);
+          savePos(t);
+        }
+        var lastSaved = -1;
+        function savePos(t){
+          t = Math.floor(t);
+          if (!wantPlay || t === lastSaved) return;
+          lastSaved = t;
+          try {
+            var u = new URL(window.parent.location.href);
+            u.searchParams.set('pos', nonce + ':' + t);
+            window.parent.history.replaceState(window.parent.history.state, '', u.toString());
+          } catch(_) {}
+        }
+        // 탭이 숨겨지면 2초 간격으로만 (위치 저장은 계속)
+        function schedule(){
+          clearInterval(window.__yt_hdr_timer__);
+          window.__yt_hdr_timer__ = setInterval(tick, document.hidden ? 2000 : 250);
         }
-        clearInterval(window.__yt_hdr_timer__); window.__yt_hdr_timer__ = setInterval(tick, 250); tick();
+        document.addEventListener('visibilitychange', function(){ schedule(); if (!document.hidden) tick(); });
+        schedule(); tick();
 
         var tap = document.getElementById('tap-btn');
         if (tap) tap.addEventListener('click', enableSound);
       })();
     </script>
-    """)
-    st_html(tpl.substitute(
+""")
+
+# 현재 플레이리스트 표 (재생 중인 행만 경과 시간 갱신)
+_PL_TABLE_TPL = Template("""
+    <style>
+      body { margin:0; font-family: "Source Sans Pro", sans-serif; }
+      table { width:100%; border-collapse:collapse; }
+      td { padding:4px 6px; vertical-align:middle; border-bottom:1px solid #eee; }
+      td.th { width:60px; }
+      td.th img { width:56px; border-radius:4px; display:block; }
+      .t { font-weight:600; font-size:14px; color:#111; }
+      .m { font-size:12px; color:#666; line-height:1.25; }
+      tr[draggable] { cursor:grab; }
+      tr.drag { opacity:0.4; }
+      tr.over td { border-top:2px solid #5B6CFF; }
+      .np { display:inline-block; padding:2px 8px; font-size:12px; border-radius:999px; background:#5B6CFF; color:#fff; margin-left:8px; font-weight:400; }
+    </style>
+    <table>$rows</table>
+    <script>
+      // 드래그로 순서 변경 → 부모 URL에 새 순서를 적고 숨은 버튼을 눌러 fragment만 rerun
+      (function() {
+        var ver = $ver;
+        var tbody = document.querySelector('table');
+        var dragging = null;
+        function commit() {
+          var order = Array.prototype.map.call(tbody.querySelectorAll('tr[data-idx]'), function(tr){ return tr.getAttribute('data-idx'); });
+          try {
+            var P = window.parent;
+            var u = new URL(P.location.href);
+            u.searchParams.set('pl_reorder', ver + '.' + order.join(','));
+            P.history.replaceState(P.history.state, '', u.toString());
+            var b = P.document.querySelector('.st-key-pl_reorder_apply button');
+            if (b) b.click();
+          } catch(_) {}
+        }
+        tbody.addEventListener('dragstart', function(e){
+          dragging = e.target.closest('tr[data-idx]');
+          if (dragging) { dragging.classList.add('drag'); e.dataTransfer.effectAllowed = 'move'; }
+        });
+        tbody.addEventListener('dragover', function(e){
+          var tr = e.target.closest('tr[data-idx]');
+          if (!dragging || !tr || tr === dragging) return;
+          e.preventDefault();
+          tbody.querySelectorAll('tr.over').forEach(function(x){ x.classList.remove('over'); });
+          tr.classList.add('over');
+        });
+        tbody.addEventListener('drop', function(e){
+          var tr = e.target.closest('tr[data-idx]');
+          if (!dragging || !tr || tr === dragging) return;
+          e.preventDefault();
+          var rows = Array.prototype.slice.call(tbody.querySelectorAll('tr[data-idx]'));
+          tr.parentNode.insertBefore(dragging, rows.indexOf(dragging) < rows.indexOf(tr) ? tr.nextSibling : tr);
+          commit();
+        });
+        tbody.addEventListener('dragend', function(){
+          if (dragging) dragging.classList.remove('drag');
+          tbody.querySelectorAll('tr.over').forEach(function(x){ x.classList.remove('over'); });
+          dragging = null;
+        });
+      })();
+      (function() {
+        function pad2(n){ return String(n).padStart(2,'0'); }
+        function fmt(t) {
+          t = Math.max(0, Math.floor(t));
+          var h = Math.floor(t/3600);
+          var m = Math.floor((t%3600)/60);
+          var s = Math.floor(t%60);
+          return (h>0) ? (h + ":" + pad2(m) + ":" + pad2(s)) : (m + ":" + pad2(s));
+        }
+        var lab = document.getElementById('row-elapsed');
+        if (!lab) return;
+        var base = $base_at;  // 렌더 시 경과초
+        var startedAt = Date.now();
+        var last = '';
+        function tick(){
+          var txt = fmt(base + (Date.now() - startedAt) / 1000.0);
+          if (txt !== last) { lab.textContent = txt; last = txt; }
+        }
+        // 탭이 숨겨지면 멈췄다가 다시 보일 때 재개
+        function schedule(){
+          clearInterval(window.__ytap_row_timer__);
+          if (!document.hidden) { window.__ytap_row_timer__ = setInterval(tick, 250); tick(); }
+        }
+        document.addEventListener('visibilitychange', schedule);
+        schedule();
+      })();
+    </script>
+""")
+
+def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int, total_secs_opt: Optional[int], playing: bool,
+                                  nonce: int = 0):
+    """비디오는 숨기고 오디오만. 헤더 pill(전체 진행) 실시간 업데이트.
+       자동재생 정책 회피: 자동재생 시에는 항상 mute로 시작하고, 버튼 클릭 시 unMute.
+       재생 위치는 부모 URL의 pos=nonce:초 로 남겨 다음 rerun이 그대로 이어받는다."""
+    total_val = total_secs_opt if (total_secs_opt is not None) else 0
+    total_label = format_duration(total_secs_opt if total_secs_opt is not None else None)
+    init_label = f"{format_duration(before_secs + start_at)} / {total_label}"
+    st_html(_HIDDEN_PLAYER_TPL.substitute(
         init_label=init_label,
         vid=video_id,
         startAt=start_at,
@@ -830,9 +1494,196 @@ def _render_hidden_youtube_player(video_id: str, start_at: int, before_secs: int
         totalSecs=total_val,
         totalKnown=("true" if total_secs_opt is not None else "false"),
         playing=("true" if playing else "false"),
+        nonce=int(nonce),
     ), height=64, scrolling=False)
 
 # ---------- 렌더링 ----------
+def _rerun_fragment():
+    """fragment 재실행 중이면 그 영역만, 전체 실행 중에 불렸으면 전체 rerun."""
+    try:
+        st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException:
+        st.rerun()
+
+@st.fragment
+def _playlist_fragment():
+    """헤더·플레이어·곡 목록. 재생/순서/삭제 버튼은 이 영역만 다시 그린다."""
+    _apply_playlist_reorder()
+    st.button("⇅", key="pl_reorder_apply")   # 표의 드래그 JS가 누른다 (CSS로 숨김)
+    # ===== 현재 플레이리스트 헤더 (이름 표시) =====
+    st.markdown("<div class='hdrctl-marker'></div>", unsafe_allow_html=True)  # 모바일 1행 고정 마커
+    h_label, h_clear, h_save, h_play = st.columns([6, 0.9, 0.9, 0.9])
+    with h_label:
+        pl_name = st.session_state.get("playlist_name", "새 플레이리스트")
+        st.subheader(f"▶ 플레이리스트 · {pl_name}", anchor=False)
+
+    with h_clear:
+        if st.button("🧹", key="btn_clear_inline", help="현재 화면 플레이리스트 초기화", use_container_width=True):
+            st.session_state.is_playing = False
+            st.session_state.play_start_ts = None
+            st.session_state.elapsed_acc = 0.0
+            st.session_state.current_index = 0
+            st.session_state.playlist = []
+            _bump_playlist_version()
+            st.session_state.audio_nonce += 1
+            st.session_state.playlist_name = "새 플레이리스트"
+            st.session_state.playlist_path = None
+            _rerun_fragment()
+
+    with h_save:
+        if st.button("💾", key="btn_save_inline", use_container_width=True, help="현재 플레이리스트 저장", disabled=not ready):
+            st.session_state._show_save_prompt = True
+            _rerun_fragment()
+
+    with h_play:
+        play_icon = "⏸" if st.session_state.is_playing else "⏵"
+        if st.button(play_icon, help="재생/일시정지", key="hdr_play_btn"):
+            if st.session_state.is_playing:
+                st.session_state.elapsed_acc = _elapsed_now()
+                st.session_state.play_start_ts = None
+                st.session_state.is_playing = False
+            else:
+                st.session_state.play_start_ts = time.time()
+                st.session_state.is_playing = True
+            st.session_state.audio_nonce += 1
+            _rerun_fragment()
+
+    # 저장 프롬프트
+    if st.session_state._show_save_prompt:
+        name_default = datetime.datetime.now().strftime("노동요 %Y-%m-%d %H%M")
+        c_in, c_ok, c_cancel = st.columns([0.60, 0.16, 0.16])
+        pl_name_in = c_in.text_input("저장 이름", key="pl_save_name_inline", value=name_default, label_visibility="collapsed")
+        if c_ok.button("저장", key="pl_save_ok", type="primary", use_container_width=True):
+            ok, msg = save_current_playlist_to_repo(pl_name_in)
+            if ok:
+                st.session_state._show_save_prompt = False
+                st.toast(msg)
+                st.rerun()   # 왼쪽 저장 목록도 갱신해야 하므로 전체 rerun
+            else:
+                st.error(msg)
+        if c_cancel.button("취소", key="pl_save_cancel", use_container_width=True):
+            st.session_state._show_save_prompt = False
+            _rerun_fragment()
+
+    # ===== 시간 표시(상단 pill) + 숨김 YouTube 플레이어 =====
+    pl = st.session_state.playlist
+    idx = st.session_state.current_index
+    TOTAL_SECS_OPT = _playlist_total_secs(pl)
+    BEFORE_SECS = _sum_before_index(pl, idx)
+    CUR_ELAPSED = int(_elapsed_now()) if (pl and 0 <= idx < len(pl)) else 0
+    START_AT = CUR_ELAPSED  # 현재 트랙 경과
+
+    if st.session_state.is_playing and pl:
+        cur = pl[idx]
+        # 같은 재생 세션이면 처음 시작 위치를 그대로 — 템플릿이 같아야 iframe이 다시 로드되지 않는다
+        anchor_key = (st.session_state.audio_nonce, cur.video_id, BEFORE_SECS, TOTAL_SECS_OPT)
+        anchor = st.session_state.get("_player_anchor")
+        if anchor is None or anchor[0] != anchor_key:
+            anchor = (anchor_key, START_AT)
+            st.session_state._player_anchor = anchor
+        _render_hidden_youtube_player(
+            video_id=cur.video_id,
+            start_at=anchor[1],
+            before_secs=BEFORE_SECS,
+            total_secs_opt=TOTAL_SECS_OPT,
+            playing=True,
+            nonce=st.session_state.audio_nonce,
+        )
+        warm_next_track(pl, idx)
+    else:
+        # 정지/일시정지: 정적 표시
+        total_label = format_duration(TOTAL_SECS_OPT if TOTAL_SECS_OPT is not None else None)
+        st.markdown(
+            f"<div style='text-align:right'><span style='padding:4px 10px;border-radius:999px;background:#f3f4f6;font-size:12px;color:#111'>{format_duration(BEFORE_SECS + CUR_ELAPSED)} / {total_label}</span></div>",
+            unsafe_allow_html=True,
+        )
+
+    st.markdown("---")
+
+    # ===== 현재 플레이리스트 표 =====
+    if not st.session_state.playlist:
+        st.info("아직 추가된 곡이 없습니다. 위의 ➕에서 URL을 붙여넣고 추가하세요.")
+    else:
+        pl = st.session_state.playlist
+        idx = st.session_state.current_index
+        playing = st.session_state.is_playing
+
+        # 표 전체를 하나의 HTML 블록으로 — 재생 중인 행만 새로 만든다
+        rows = list(_playlist_rows_html(pl))
+        if playing and 0 <= idx < len(pl):
+            rows[idx] = _playlist_row_html(idx, pl[idx], active=True)
+        st_html(_PL_TABLE_TPL.substitute(rows="\n".join(rows), base_at=START_AT, ver=st.session_state.playlist_version),
+                height=min(66 * len(pl) + 8, 520), scrolling=len(pl) > 7)
+
+        # 컨트롤은 선택한 곡 하나에 대해서만 — 모바일에서 한 줄 유지 (마커 + 인접 형제 CSS)
+        nxt = st.session_state.pop("_pl_sel_next", None)
+        if nxt is not None:
+            st.session_state.pl_sel_idx = nxt
+        if not 0 <= st.session_state.get("pl_sel_idx", idx) < len(pl):
+            st.session_state.pl_sel_idx = min(idx, len(pl) - 1)
+        elif "pl_sel_idx" not in st.session_state:
+            st.session_state.pl_sel_idx = idx
+        s_col, ctl_col = st.columns([6.6, 2.8])
+        i = s_col.selectbox("선택한 곡", list(range(len(pl))), key="pl_sel_idx",
+                            format_func=lambda k: f"{k+1}. {pl[k].title}", label_visibility="collapsed")
+        ctl_col.markdown("<div class='rowctl-marker'></div>", unsafe_allow_html=True)
+        pcol, upcol, downcol, delcol = ctl_col.columns([0.22, 0.22, 0.22, 0.22], gap="small")
+        is_this_playing = playing and (i == idx)
+        if pcol.button("⏸" if is_this_playing else "⏵", key="pl_sel_play", help="재생/일시정지"):
+            if i == idx:
+                if st.session_state.is_playing:
+                    st.session_state.elapsed_acc = _elapsed_now()
+                    st.session_state.play_start_ts = None
+                    st.session_state.is_playing = False
+                else:
+                    st.session_state.play_start_ts = time.time()
+                    st.session_state.is_playing = True
+            else:
+                st.session_state.current_index = i
+                if prefetch_tracks(pl, start=i, n=1):   # 미리 데워 둔 캐시에서 바로 채워짐
+                    _bump_playlist_version()
+                st.session_state.elapsed_acc = 0.0
+                st.session_state.play_start_ts = time.time()
+                st.session_state.is_playing = True
+            st.session_state.audio_nonce += 1
+            _rerun_fragment()
+
+        if upcol.button("↑", key="pl_sel_up", help="위로") and i > 0:
+            st.session_state.elapsed_acc = _elapsed_now()
+            st.session_state.play_start_ts = None
+            st.session_state.is_playing = False
+            pl[i-1], pl[i] = pl[i], pl[i-1]
+            _bump_playlist_version()
+            if st.session_state.current_index == i:
+                st.session_state.current_index -= 1
+            elif st.session_state.current_index == i - 1:
+                st.session_state.current_index += 1
+            st.session_state._pl_sel_next = i - 1
+            _rerun_fragment()
+
+        if downcol.button("↓", key="pl_sel_down", help="아래로") and i < len(pl)-1:
+            st.session_state.elapsed_acc = _elapsed_now()
+            st.session_state.play_start_ts = None
+            st.session_state.is_playing = False
+            pl[i+1], pl[i] = pl[i], pl[i+1]
+            _bump_playlist_version()
+            if st.session_state.current_index == i:
+                st.session_state.current_index += 1
+            elif st.session_state.current_index == i + 1:
+                st.session_state.current_index -= 1
+            st.session_state._pl_sel_next = i + 1
+            _rerun_fragment()
+
+        if delcol.button("🗑", key="pl_sel_del", help="삭제"):
+            st.session_state.elapsed_acc = _elapsed_now()
+            st.session_state.play_start_ts = None
+            st.session_state.is_playing = False
+            del pl[i]
+            _bump_playlist_version()
+            if st.session_state.current_index >= len(pl):
+                st.session_state.current_index = max(0, len(pl) - 1)
+            _rerun_fragment()
+
 def render_labor_song_tab():
     st.header("④ 노동요")
     st.caption("YouTube 오디오 재생 · 비디오 숨김 · 간단 플레이리스트 (Cloud 친화 모드)")
@@ -861,6 +1712,7 @@ def render_labor_song_tab():
                         st.error("영상을 찾을 수 없습니다. 다른 URL을 시도해 보세요.")
                     else:
                         st.session_state.playlist.append(tr)
+                        _bump_playlist_version()
                         if len(st.session_state.playlist) == 1:
                             st.session_state.current_index = 0
                         st.session_state.playlist_name = st.session_state.get("playlist_name") or "새 플레이리스트"
@@ -928,213 +1780,7 @@ def render_labor_song_tab():
 
         st.markdown("---")
 
-        # ===== 현재 플레이리스트 헤더 (이름 표시) =====
-        st.markdown("<div class='hdrctl-marker'></div>", unsafe_allow_html=True)  # 모바일 1행 고정 마커
-        h_label, h_clear, h_save, h_play = st.columns([6, 0.9, 0.9, 0.9])
-        with h_label:
-            pl_name = st.session_state.get("playlist_name", "새 플레이리스트")
-            st.subheader(f"▶ 플레이리스트 · {pl_name}", anchor=False)
-
-        with h_clear:
-            if st.button("🧹", key="btn_clear_inline", help="현재 화면 플레이리스트 초기화", use_container_width=True):
-                st.session_state.is_playing = False
-                st.session_state.play_start_ts = None
-                st.session_state.elapsed_acc = 0.0
-                st.session_state.current_index = 0
-                st.session_state.playlist = []
-                st.session_state.audio_nonce += 1
-                st.session_state.playlist_name = "새 플레이리스트"
-                st.session_state.playlist_path = None
-                st.rerun()
-
-        with h_save:
-            if st.button("💾", key="btn_save_inline", use_container_width=True, help="현재 플레이리스트 저장", disabled=not ready):
-                st.session_state._show_save_prompt = True
-                st.rerun()
-
-        with h_play:
-            play_icon = "⏸" if st.session_state.is_playing else "⏵"
-            if st.button(play_icon, help="재생/일시정지", key="hdr_play_btn"):
-                if st.session_state.is_playing:
-                    st.session_state.elapsed_acc = _elapsed_now()
-                    st.session_state.play_start_ts = None
-                    st.session_state.is_playing = False
-                else:
-                    st.session_state.play_start_ts = time.time()
-                    st.session_state.is_playing = True
-                st.session_state.audio_nonce += 1
-                st.rerun()
-
-        # 저장 프롬프트
-        if st.session_state._show_save_prompt:
-            name_default = datetime.datetime.now().strftime("노동요 %Y-%m-%d %H%M")
-            c_in, c_ok, c_cancel = st.columns([0.60, 0.16, 0.16])
-            pl_name_in = c_in.text_input("저장 이름", key="pl_save_name_inline", value=name_default, label_visibility="collapsed")
-            if c_ok.button("저장", key="pl_save_ok", type="primary", use_container_width=True):
-                ok, msg = save_current_playlist_to_repo(pl_name_in)
-                if ok:
-                    st.session_state._show_save_prompt = False
-                    st.toast(msg)
-                    st.rerun()
-                else:
-                    st.error(msg)
-            if c_cancel.button("취소", key="pl_save_cancel", use_container_width=True):
-                st.session_state._show_save_prompt = False
-                st.rerun()
-
-        # ===== 시간 표시(상단 pill) + 숨김 YouTube 플레이어 =====
-        pl = st.session_state.playlist
-        idx = st.session_state.current_index
-        TOTAL_SECS_OPT = _playlist_total_secs(pl)
-        BEFORE_SECS = _sum_before_index(pl, idx)
-        CUR_ELAPSED = int(_elapsed_now()) if (pl and 0 <= idx < len(pl)) else 0
-        START_AT = CUR_ELAPSED  # 현재 트랙 경과
-
-        if st.session_state.is_playing and pl:
-            cur = pl[idx]
-            _render_hidden_youtube_player(
-                video_id=cur.video_id,
-                start_at=START_AT,
-                before_secs=BEFORE_SECS,
-                total_secs_opt=TOTAL_SECS_OPT,
-                playing=True
-            )
-        else:
-            # 정지/일시정지: 정적 표시
-            total_label = format_duration(TOTAL_SECS_OPT if TOTAL_SECS_OPT is not None else None)
-            st.markdown(
-                f"<div style='text-align:right'><span style='padding:4px 10px;border-radius:999px;background:#f3f4f6;font-size:12px;color:#111'>{format_duration(BEFORE_SECS + CUR_ELAPSED)} / {total_label}</span></div>",
-                unsafe_allow_html=True,
-            )
-
-        st.markdown("---")
-
-        # ===== 현재 플레이리스트 표 =====
-        if not st.session_state.playlist:
-            st.info("아직 추가된 곡이 없습니다. 위의 ➕에서 URL을 붙여넣고 추가하세요.")
-        else:
-            pl = st.session_state.playlist
-            idx = st.session_state.current_index
-            for i, tr in enumerate(pl):
-                left_c, mid_c, right_c = st.columns([0.6, 6, 2.8])
-                left_c.image(tr.thumbnail_url, width=56)
-
-                title_html = f"<span style='font-weight:600'>{_html.escape(tr.title)}</span>"
-                if st.session_state.is_playing and i == idx:
-                    title_html += " <span style='display:inline-block;padding:2px 8px;font-size:12px;border-radius:999px;background:#5B6CFF;color:#fff;margin-left:8px'>Now Playing</span>"
-                mid_c.markdown(title_html, unsafe_allow_html=True)
-
-                # --- 행 하단 시간표시 (재생 중인 행은 로컬 타이머 + 총길이 동적 보정) ---
-                if st.session_state.is_playing and i == idx:
-                    row_total_str = format_duration(tr.duration)
-                    is_playing_js = "true" if st.session_state.is_playing else "false"
-                    base_at = START_AT
-                    row_tpl = Template("""
-                    <div style="font-size:12px;color:#666;margin-bottom:8px;line-height:1.25">
-                      ID: $vid · <span id="row-elapsed">$init_elapsed</span> / <span id="row-total">$row_total</span>
-                    </div>
-                    <script>
-                      (function() {
-                        function pad2(n){ return String(n).padStart(2,'0'); }
-                        function fmt(t) {
-                          t = Math.max(0, Math.floor(t));
-                          var h = Math.floor(t/3600);
-                          var m = Math.floor((t%3600)/60);
-                          var s = Math.floor(t%60);
-                          return (h>0) ? (h + ":" + pad2(m) + ":" + pad2(s)) : (m + ":" + pad2(s));
-                        }
-                        var lab = document.getElementById('row-elapsed');
-                        var tot = document.getElementById('row-total');
-                        var isPlaying = $is_playing;
-                        var base = $base_at;  // 렌더 시 경과초
-                        var startedAt = Date.now();
-
-                        function updateTotal(){
-                          try{
-                            if (window.__yt_hidden_player && typeof window.__yt_hidden_player.getDuration === 'function'){
-                              var d = window.__yt_hidden_player.getDuration() || 0;
-                              if (isFinite(d) && d > 0 && tot) tot.textContent = fmt(d);
-                            }
-                          }catch(_){}
-                        }
-
-                        function tick(){
-                          var t = base;
-                          if (isPlaying) {
-                            var dt = (Date.now() - startedAt) / 1000.0;
-                            t = base + dt;
-                          }
-                          if (lab) lab.textContent = fmt(t);
-                          updateTotal();
-                        }
-                        clearInterval(window.__ytap_row_timer__); window.__ytap_row_timer__ = setInterval(tick, 250); tick();
-                      })();
-                    </script>
-                    """)
-                    st_html(row_tpl.substitute(
-                        vid=tr.video_id,
-                        init_elapsed=format_duration(START_AT),
-                        row_total=row_total_str,
-                        is_playing=is_playing_js,
-                        base_at=base_at
-                    ), height=36, scrolling=False)
-                else:
-                    mid_c.markdown(
-                        f"<div style='font-size:12px;color:#666;margin-bottom:8px;line-height:1.25'>ID: {tr.video_id} · 0:00 / {format_duration(tr.duration)}</div>",
-                        unsafe_allow_html=True,
-                    )
-
-                # 오른쪽 컨트롤 — 모바일에서 한 줄 유지 (마커 + 인접 형제 CSS)
-                right_c.markdown("<div class='rowctl-marker'></div>", unsafe_allow_html=True)
-                pcol, upcol, downcol, delcol = right_c.columns([0.22, 0.22, 0.22, 0.22], gap="small")
-                is_this_playing = st.session_state.is_playing and (i == idx)
-                if pcol.button("⏸" if is_this_playing else "⏵", key=f"play_{i}", help="재생/일시정지"):
-                    if i == idx:
-                        if st.session_state.is_playing:
-                            st.session_state.elapsed_acc = _elapsed_now()
-                            st.session_state.play_start_ts = None
-                            st.session_state.is_playing = False
-                        else:
-                            st.session_state.play_start_ts = time.time()
-                            st.session_state.is_playing = True
-                    else:
-                        st.session_state.current_index = i
-                        st.session_state.elapsed_acc = 0.0
-                        st.session_state.play_start_ts = time.time()
-                        st.session_state.is_playing = True
-                    st.session_state.audio_nonce += 1
-                    st.rerun()
-
-                if upcol.button("↑", key=f"up_{i}", help="위로") and i > 0:
-                    st.session_state.elapsed_acc = _elapsed_now()
-                    st.session_state.play_start_ts = None
-                    st.session_state.is_playing = False
-                    pl[i-1], pl[i] = pl[i], pl[i-1]
-                    if st.session_state.current_index == i:
-                        st.session_state.current_index -= 1
-                    elif st.session_state.current_index == i - 1:
-                        st.session_state.current_index += 1
-                    st.rerun()
-
-                if downcol.button("↓", key=f"down_{i}", help="아래로") and i < len(pl)-1:
-                    st.session_state.elapsed_acc = _elapsed_now()
-                    st.session_state.play_start_ts = None
-                    st.session_state.is_playing = False
-                    pl[i+1], pl[i] = pl[i], pl[i+1]
-                    if st.session_state.current_index == i:
-                        st.session_state.current_index += 1
-                    elif st.session_state.current_index == i + 1:
-                        st.session_state.current_index -= 1
-                    st.rerun()
-
-                if delcol.button("🗑", key=f"del_{i}", help="삭제"):
-                    st.session_state.elapsed_acc = _elapsed_now()
-                    st.session_state.play_start_ts = None
-                    st.session_state.is_playing = False
-                    del pl[i]
-                    if st.session_state.current_index >= len(pl):
-                        st.session_state.current_index = max(0, len(pl) - 1)
-                    st.rerun()
+        _playlist_fragment()
 
     # ---------------- Left: 저장된 플레이리스트 목록 ----------------
     with left:
@@ -1153,12 +1799,12 @@ def render_labor_song_tab():
                     c_name, c_load, c_del = st.columns([0.64, 0.18, 0.18])
                     c_name.write(f"• {base}")
                     if c_load.button("📂", key=f"load_{r['path']}", help="불러오기", use_container_width=True):
-                        ok, msg = load_playlist_from_repo(r["path"])
+                        ok, msg = load_playlist_from_repo(r["path"], sha=r.get("sha"))
                         if ok: st.success(msg)
                         else:  st.error(msg)
                         st.rerun()
                     if c_del.button("🗑", key=f"del_{r['path']}", help="지우기", use_container_width=True):
-                        ok, msg = delete_playlist_by_path(r["path"])
+                        ok, msg = delete_playlist_by_path(r["path"], sha=r.get("sha"))
                         if ok:
                             st.toast("플레이리스트를 삭제했습니다.")
                             st.rerun()
@@ -1166,145 +1812,24 @@ def render_labor_song_tab():
                             st.error(msg)
 
 # =============================
-# TABS
+# HTML 조각/템플릿 (모듈 로드 시 한 번만)
+# 자리표시자가 하나뿐인 페이지는 Template 대신 str.replace — 본문에 다른 $ 없음
 # =============================
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["① 웹하드", "② 메모장", "③ 스니펫", "④ 노동요", "⑤ 설정"])
-
-# ---------- TAB 1: 웹하드 ----------
-with tab1:
-    st.header("① 웹하드")
-
-    col_upload, col_list = st.columns([0.40, 0.60], vertical_alignment="top")
-
-    with col_upload:
-        st.markdown('<div class="section-label"><span class="ico">⬆️</span><span>파일 업로드</span></div>', unsafe_allow_html=True)
-        files = st.file_uploader(
-            "",
-            accept_multiple_files=True,
-            label_visibility="collapsed",
-            key=f"uploader_{st.session_state.uploader_key}"
-        )
-
-        if ready and files:
-            commit_msg = "Upload via My Blackhole"
-            fps = tuple(sorted((f.name, getattr(f, "size", 0)) for f in files))
-            if st.session_state.get("_uploaded_selection_sig") != fps:
-                results = []
-                with st.spinner("업로드 중…"):
-                    for f in files:
-                        try:
-                            base_name = f.name
-                            base, ext = os.path.splitext(base_name)
-                            candidate = path_join(folder, base_name)
-                            idx = 1
-                            while get_file_sha_if_exists(owner, repo, branch, candidate, token)[0]:
-                                candidate = path_join(folder, f"{base} ({idx}){ext}")
-                                idx += 1
-                            content = f.read()
-                            if len(content) > 95 * 1024 * 1024:
-                                raise RuntimeError("파일이 너무 큽니다 (API 한계 ~100MB)")
-                            put_file(owner, repo, branch, candidate, content, token, commit_msg, None)
-                            results.append({"name": os.path.basename(candidate), "size (KB)": round(len(content)/1024, 1), "status": "uploaded"})
-                        except Exception as e:
-                            results.append({"name": getattr(f, 'name', 'unknown'),
-                                            "size (KB)": round(getattr(f, 'size', 0)/1024, 1) if hasattr(f, 'size') else None,
-                                            "status": f"error: {e}"})
-                st.session_state["_uploaded_selection_sig"] = fps
-                if any(r.get("status") == "uploaded" for r in results):
-                    st.session_state.uploader_key += 1
-                    st.toast("업로드 완료")
-                    st.rerun()
-                if any(isinstance(r.get("status"), str) and r["status"].startswith("error") for r in results):
-                    st.warning("일부 항목 업로드 실패")
-
-    with col_list:
-        st.markdown('<div class="section-label"><span class="ico">📁</span><span>파일 목록</span></div>', unsafe_allow_html=True)
-        with st.container(border=True):
-            try:
-                items = list_folder(owner, repo, branch, ensure_folder_path(folder), token) if ready else []
-                files_data = []
-                for it in items:
-                    if it.get("type") == "file":
-                        rel_path = it.get("path")
-                        raw_url = f"{gh_raw_base(owner, repo, branch)}/{rel_path}"
-                        files_data.append({
-                            "name": it.get("name"),
-                            "size_kb": round(it.get("size", 0)/1024, 1),
-                            "raw_url": raw_url,
-                            "rel_path": rel_path,
-                            "sha": it.get("sha"),
-                        })
-
-                if files_data:
-                    is_private = repo_is_private(owner, repo, token) if ready else True
-                    inline_limit_mb = float(st.session_state.get("inline_dl_limit_mb", 0))
-                    inline_limit_kb = inline_limit_mb * 1024
-
-                    def _svg_download():
-                        return """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
-                        stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                        <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"/>
-                        <polyline points="7 10 12 15 17 10"/><line x1="12" y1="15" x2="12" y2="3"/></svg>"""
-
-                    def _svg_link():
-                        return """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
-                            stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                            <path d="M10 13a5 5 0 0 1 0-7l2-2a5 5 0 0 1 7 7l-1 1"/>
-                            <path d="M14 11a5 5 0 0 1 0 7l-2 2a5 5 0 0 1-7-7l1-1"/></svg>"""
-
-                    def _svg_trash():
-                        return """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
-                        stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-                        <polyline points="3 6 5 6 21 6"/><path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6"/>
-                        <path d="M10 11v6"/><path d="M14 11v6"/><path d="M8 6V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"/></svg>"""
-
-                    rows = []
-                    for f in files_data:
-                        # 메모리 절약: 기본적으로 Data URL을 만들지 않음
-                        data_uri = ""
-                        raw_link = f["raw_url"]
-                        gh_web  = f"https://github.com/{owner}/{repo}/blob/{branch}/{f['rel_path']}?raw=1"
-                        if inline_limit_kb > 0 and f["size_kb"] <= inline_limit_kb:
-                            try:
-                                _bytes = get_raw_file_bytes(owner, repo, branch, f["rel_path"], token, sha=f.get("sha"))
-                                data_uri = build_data_uri(_bytes)
-                            except Exception:
-                                data_uri = ""
-                        dl_href  = data_uri if data_uri else (gh_web if is_private else raw_link)
-                        dl_title = "다운로드" + ("" if data_uri else (" (GitHub 로그인 필요)" if is_private else ""))
-                        copy_url  = gh_web if is_private else raw_link
-                        copy_note = "(private: 로그인 필요)" if is_private else ""
-
-                        enc = base64.urlsafe_b64encode(f["rel_path"].encode("utf-8")).decode("ascii")
-                        del_qs = f"?del={enc}&ts={int(datetime.datetime.now().timestamp())}"
-
-                        rows.append(f"""
-      <div class="row" data-del="{_html.escape(del_qs)}" title="{_html.escape(f['name'])}">
-        <div class="name">{_html.escape(f['name'])}</div>
-        <div class="size">{f['size_kb']} KB</div>
-        <div class="btns">
-          <a class="btn dl"
-             href="{_html.escape(dl_href)}"
-             data-href="{_html.escape(dl_href)}"
-             target="_blank" rel="noopener noreferrer"
-             download="{_html.escape(f['name'])}"
-             title="{_html.escape(dl_title)}">
-            {_svg_download()}
-          </a>
-          <button class="btn copy" data-copy="{_html.escape(copy_url)}" title="URL 복사 {copy_note}">
-            {_svg_link()}
-          </button>
-          <button class="btn delete" data-del="{_html.escape(del_qs)}" title="삭제">
-            {_svg_trash()}
-          </button>
-        </div>
-      </div>
-                        """.strip())
-
-                    list_html = "\n".join(rows)
-                    comp_height = max(72, min(800, 12 + 56 * len(rows)))
-
-                    HTML_TEMPLATE = Template(r"""
+SVG_DOWNLOAD = """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
+  stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+  <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"/>
+  <polyline points="7 10 12 15 17 10"/><line x1="12" y1="15" x2="12" y2="3"/></svg>"""
+SVG_LINK = """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
+  stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+  <path d="M10 13a5 5 0 0 1 0-7l2-2a5 5 0 0 1 7 7l-1 1"/>
+  <path d="M14 11a5 5 0 0 1 0 7l-2 2a5 5 0 0 1-7-7l1-1"/></svg>"""
+SVG_TRASH = """<svg viewBox="0 0 24 24" width="16" height="16" fill="none"
+  stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+  <polyline points="3 6 5 6 21 6"/><path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6"/>
+  <path d="M10 11v6"/><path d="M14 11v6"/><path d="M8 6V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"/></svg>"""
+
+# ① 웹하드 파일 목록
+_FILE_LIST_TPL = Template(r"""
 <!DOCTYPE html>
 <html><head><meta charset="utf-8" />
 <style>
@@ -1323,6 +1848,9 @@ with tab1:
     grid-template-columns: minmax(0,1fr) auto auto;
     column-gap: var(--gap);
     align-items: center;
+    /* 화면 밖 행은 레이아웃/페인트 생략 (높이는 46px로 가정) */
+    content-visibility: auto;
+    contain-intrinsic-size: auto 46px;
   }
   .name {
     min-width: 0;
@@ -1349,15 +1877,26 @@ with tab1:
 </head>
 <body>
   <div class="wrap" id="rows">
-$LIST_HTML
+$list_html
     <iframe id="bg" style="display:none"></iframe>
   </div>
+<script type="application/json" id="rest-rows">$rest_json</script>
 
 <script>
 (function() {
   const rows = document.getElementById('rows');
   const bg = document.getElementById('bg');
 
+  // 큰 폴더: 첫 화면 분량만 HTML로 오고 나머지 행은 유휴 시간에 50개씩 붙인다
+  const rest = JSON.parse(document.getElementById('rest-rows').textContent || '[]');
+  const idle = window.requestIdleCallback || ((cb) => setTimeout(cb, 16));
+  function pump() {
+    if (!rest.length) return;
+    bg.insertAdjacentHTML('beforebegin', rest.splice(0, 50).join(''));
+    idle(pump);
+  }
+  idle(pump);
+
   function setHeights(px) {
     try {
       const ifr = window.frameElement;
@@ -1456,142 +1995,46 @@ $LIST_HTML
     bg.src = target;
   });
 
-  // 다운로드 버튼: data:면 기본 동작, 그 외는 새 탭/최상위로
+  // 공개 리포의 작은 파일: 클릭할 때 raw(CORS 허용)에서 받아 파일명 그대로 저장
+  async function fetchAndSave(a, url) {
+    const name = a.getAttribute('download') || '';
+    a.style.opacity = '0.6';
+    try {
+      const r = await fetch(url);
+      if (!r.ok) throw new Error(String(r.status));
+      const obj = URL.createObjectURL(await r.blob());
+      const tmp = document.createElement('a');
+      tmp.href = obj; tmp.download = name;
+      document.body.appendChild(tmp); tmp.click(); tmp.remove();
+      setTimeout(() => URL.revokeObjectURL(obj), 10000);
+    } catch(_) {
+      openOutside(url);
+    } finally {
+      a.style.opacity = '';
+    }
+  }
+
+  // 다운로드 버튼: data:면 기본 동작, data-fetch면 지연 다운로드, 그 외는 새 탭/최상위로
   rows.addEventListener('click', (e) => {
     const a = e.target.closest('.btn.dl');
     if (!a) return;
     const url = a.getAttribute('data-href') || a.getAttribute('href') || '';
     if (!url) return;
-    if (!url.startsWith('data:')) {
-      e.preventDefault();
-      openOutside(url);
-    }
+    if (url.startsWith('data:')) return;
+    e.preventDefault();
+    if (a.hasAttribute('data-fetch')) fetchAndSave(a, url);
+    else openOutside(url);
   });
 
 })();
 </script>
 </body></html>
 """)
-                    html_render = HTML_TEMPLATE.substitute(LIST_HTML=list_html)
-                    st_html(html_render, height=comp_height)
-                else:
-                    st.info("이 폴더에 파일이 없거나 접근할 수 없습니다.")
-            except Exception as e:
-                st.error(f"목록 조회 오류: {e}")
-
-# ---------- TAB 2: 메모 ----------
-with tab2:
-    st.header("② 크로스디바이스 메모장")
 
-    memo_folder = ensure_folder_path(st.session_state.memo_folder)
-    memo_filename = path_join(memo_folder, "memo.md")
-    st.caption(f"메모 저장 위치: `{memo_filename}`")
-
-    if ready and not st.session_state._memo_autoloaded:
-        try:
-            sha, info = get_file_sha_if_exists(owner, repo, branch, memo_filename, token)
-            if info and info.get("content"):
-                decoded = base64.b64decode(info["content"]).decode("utf-8", errors="replace")
-                st.session_state.memo_area = decoded
-        except Exception:
-            pass
-        finally:
-            st.session_state._memo_autoloaded = True
+FILE_LIST_EAGER_ROWS = 100   # 이보다 많은 행은 JSON으로 보내 iframe에서 나눠 그림
 
-    if "load_memo" not in st.session_state:  st.session_state.load_memo  = False
-    if "clear_memo" not in st.session_state: st.session_state.clear_memo = False
-
-    if st.session_state.load_memo and ready:
-        try:
-            sha, info = get_file_sha_if_exists(owner, repo, branch, memo_filename, token)
-            if info and info.get("content"):
-                decoded = base64.b64decode(info["content"]).decode("utf-8", errors="replace")
-                st.session_state.memo_area = decoded
-                st.toast("메모 불러옴")
-            else:
-                st.session_state.memo_area = ""
-                st.toast("메모 파일이 아직 없습니다.")
-        except Exception as e:
-            st.error(f"불러오기 실패: {e}")
-        finally:
-            st.session_state.load_memo = False
-
-    if st.session_state.clear_memo and ready:
-        try:
-            sha, _ = get_file_sha_if_exists(owner, repo, branch, memo_filename, token)
-            put_file(owner, repo, branch, memo_filename, b"", token, "Clear memo", sha)
-            st.session_state.memo_area = ""
-            st.toast("메모를 비웠습니다")
-        except Exception as e:
-            st.error(f"Clear 실패: {e}")
-        finally:
-            st.session_state.clear_memo = False
-
-    st.text_area("여기에 붙여넣고 저장하세요 (Markdown)", key="memo_area", height=220)
-
-    st.markdown('<div class="memo-btn-row">', unsafe_allow_html=True)
-    c1, c2, c3, _sp = st.columns([0.12, 0.22, 0.12, 1], gap="small")
-    with c1:
-        if st.button("저장", key="memo_save_btn", type="primary", use_container_width=True, help="메모를 현재 파일에 저장"):
-            try:
-                sha, _ = get_file_sha_if_exists(owner, repo, branch, memo_filename, token)
-                body = st.session_state.get("memo_area", "")
-                put_file(owner, repo, branch, memo_filename, body.encode("utf-8"), token, "Update memo", sha)
-                st.toast("메모 저장 완료")
-            except Exception as e:
-                st.error(f"저장 실패: {e}")
-    with c2:
-        if st.button("불러오기", key="memo_load_btn", use_container_width=True):
-            st.session_state.load_memo = True
-            st.rerun()
-    with c3:
-        if st.button("Clear", key="memo_clear_btn", use_container_width=True):
-            st.session_state.clear_memo = True
-            st.rerun()
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# ---------- TAB 3: 스니펫 ----------
-with tab3:
-    st.header("③ Text Snippet")
-
-    snippet_folder = ensure_folder_path(st.session_state.snippet_folder)
-    snippet_path = path_join(snippet_folder, "snippets.json")
-
-    if ready and not st.session_state._snippets_loaded:
-        try:
-            snips, sha = load_snippets(owner, repo, branch, snippet_path, token)
-            st.session_state.snippets = snips
-            st.session_state._snip_sha = sha
-        except Exception as e:
-            st.warning(f"스니펫 로드 실패: {e}")
-        finally:
-            st.session_state._snippets_loaded = True
-
-    if st.session_state._snip_clear:
-        try:
-            st.session_state["snip_input"] = ""
-        except Exception:
-            pass
-        st.session_state._snip_clear = False
-
-    labels_html = []
-    for idx, snip in enumerate(st.session_state.snippets):
-        obj = _normalize_snippet_item(snip)
-        t = obj.get("t", "")
-        hint = obj.get("hint", "")
-        label = (t or "").replace("\n", " ").strip()
-        safe_label = _html.escape(label)
-        safe_t = _html.escape(t or "")
-        safe_hint = _html.escape(hint or "")
-        title_attr = f' title="{safe_hint}"' if hint else ""
-        labels_html.append(
-            f'<button class="chip" draggable="true" data-idx="{idx}" data-t="{safe_t}" data-hint="{safe_hint}"{title_attr}>'
-            f'  <span class="txt">{safe_label}</span>'
-            f'</button>'
-        )
-    chips_html = "\n".join(labels_html) if labels_html else '<span class="empty">등록된 스니펫이 없습니다</span>'
-
-    SNIP_TEMPLATE = Template(r"""
+# ③ 스니펫 칩 바
+_SNIP_BAR_HTML = r"""
 <!DOCTYPE html>
 <html><head><meta charset="utf-8"/>
 <style>
@@ -1657,13 +2100,11 @@ with tab3:
     else bar.insertBefore(dragging, after);
   });
 
-  bar.addEventListener('dragend', () => {
-    if (!dragging) return;
-    dragging.classList.remove('dragging');
-    dragging = null;
-
-    const chips = chipEls();
-    const arr = chips.map(el => {
+  // 연속된 정렬/삭제는 잠시 모았다가 최종 목록 한 번만 저장 (PUT 1회)
+  let saveTimer = null;
+  function flush() {
+    saveTimer = null;
+    const arr = chipEls().map(el => {
       const t = el.getAttribute('data-t') || '';
       const hint = el.getAttribute('data-hint') || '';
       return hint ? {t, hint} : {t};
@@ -1673,6 +2114,18 @@ with tab3:
       const b64 = btoa(unescape(encodeURIComponent(json)));
       bg.src = "?snip_reorder=" + encodeURIComponent(b64) + "&ts=" + Date.now();
     } catch(e) {}
+  }
+  function scheduleSave() {
+    clearTimeout(saveTimer);
+    saveTimer = setTimeout(flush, 700);
+  }
+  window.addEventListener('pagehide', () => { if (saveTimer) { clearTimeout(saveTimer); flush(); } });
+
+  bar.addEventListener('dragend', () => {
+    if (!dragging) return;
+    dragging.classList.remove('dragging');
+    dragging = null;
+    scheduleSave();
   });
 
   bar.addEventListener("click", async (e) => {
@@ -1693,19 +2146,300 @@ with tab3:
     const btn = e.target.closest(".chip");
     if(!btn) return;
     e.preventDefault();
-    const idx = btn.getAttribute("data-idx");
-    try {
-      btn.style.opacity = "0.5";
-      bg.src = "?snip_del=" + encodeURIComponent(idx) + "&ts=" + Date.now();
-      setTimeout(()=>{ btn.remove(); }, 120);
-    } catch(err) {}
+    btn.remove();
+    scheduleSave();
   });
 })();
 </script>
 </body></html>
-""")
+"""
+
+# =============================
+# TABS
+# =============================
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["① 웹하드", "② 메모장", "③ 스니펫", "④ 노동요", "⑤ 설정"])
+
+# ---------- TAB 1: 웹하드 ----------
+with tab1:
+    st.header("① 웹하드")
+
+    col_upload, col_list = st.columns([0.40, 0.60], vertical_alignment="top")
+
+    with col_upload:
+        st.markdown('<div class="section-label"><span class="ico">⬆️</span><span>파일 업로드</span></div>', unsafe_allow_html=True)
+        files = st.file_uploader(
+            "",
+            accept_multiple_files=True,
+            label_visibility="collapsed",
+            key=f"uploader_{st.session_state.uploader_key}"
+        )
+
+        if ready and files:
+            commit_msg = "Upload via My Blackhole"
+            fps = tuple(sorted((f.name, getattr(f, "size", 0)) for f in files))
+            if st.session_state.get("_uploaded_selection_sig") != fps:
+                uploaded, errors = 0, []   # 성공 개수와 (이름, 사유)만 기록
+                # 여러 개를 올릴 때는 커밋 1개로 묶음: 작은 파일뿐이면 GraphQL 한 번, 큰 파일이 섞이면 Git Data API
+                batch = []
+                with st.spinner("업로드 중…"):
+                    # 이름 충돌은 폴더 목록 한 번으로 메모리에서 해결 (파일마다 GET 하지 않음).
+                    # 30초 캐시는 다른 곳에서 올린 파일을 놓칠 수 있으므로 조건부 GET으로 최신 목록을 받음
+                    try:
+                        taken = {it.get("path") for it in _list_folder_fresh(owner, repo, branch, ensure_folder_path(folder), token)}
+                    except Exception as e:
+                        taken = None   # 목록을 모르면 같은 이름의 파일을 덮어쓸 수 있으므로 업로드하지 않음
+                        st.error(f"업로드 중단: 폴더 목록 확인 실패 ({e})")
+                    if taken is not None:
+                        for f in files:
+                            try:
+                                base_name = f.name
+                                base, ext = os.path.splitext(base_name)
+                                candidate = path_join(folder, base_name)
+                                idx = 1
+                                while candidate in taken:
+                                    candidate = path_join(folder, f"{base} ({idx}){ext}")
+                                    idx += 1
+                                taken.add(candidate)
+                                content = f.read()
+                                if len(content) > 95 * 1024 * 1024:
+                                    raise RuntimeError("파일이 너무 큽니다 (API 한계 ~100MB)")
+                                if len(files) > 1:
+                                    batch.append((candidate, content))
+                                else:
+                                    put_file(owner, repo, branch, candidate, content, token, commit_msg, None)
+                                    uploaded += 1
+                            except Exception as e:
+                                errors.append((getattr(f, "name", "unknown"), str(e)))
+                        if batch:
+                            try:
+                                if any(len(c) > GIT_DATA_THRESHOLD for _, c in batch):
+                                    git_upload_many(owner, repo, branch, batch, token, commit_msg)
+                                else:
+                                    gh_commit_batch(owner, repo, branch, batch, commit_msg, token)
+                                uploaded += len(batch)
+                            except Exception as e:
+                                errors.extend((os.path.basename(p), str(e)) for p, _ in batch)
+                if taken is not None:
+                    st.session_state["_uploaded_selection_sig"] = fps
+                err_msg = (f"{len(errors)}건 업로드 실패: " + ", ".join(n for n, _ in errors[:5])) if errors else ""
+                if uploaded:
+                    st.session_state.uploader_key += 1
+                    st.toast("업로드 완료")
+                    if errors:   # rerun 뒤에도 보이도록 토스트로
+                        st.toast(err_msg)
+                    st.rerun()
+                if errors:
+                    st.warning(err_msg)
+
+    with col_list:
+        st.markdown('<div class="section-label"><span class="ico">📁</span><span>파일 목록</span></div>', unsafe_allow_html=True)
+        with st.container(border=True):
+            try:
+                items = _list_folder_singleflight(owner, repo, branch, ensure_folder_path(folder), token).result() if ready else []
+                files_data = []
+                for it in items:
+                    if it.get("type") == "file":
+                        rel_path = it.get("path")
+                        raw_url = f"{gh_raw_base(owner, repo, branch)}/{rel_path}"
+                        files_data.append({
+                            "name": it.get("name"),
+                            "size_kb": round(it.get("size", 0)/1024, 1),
+                            "raw_url": raw_url,
+                            "rel_path": rel_path,
+                            "sha": it.get("sha"),
+                        })
+
+                if files_data:
+                    is_private = repo_is_private(owner, repo, token) if ready else True
+                    inline_limit_mb = float(st.session_state.get("inline_dl_limit_mb", 0))
+                    inline_limit_kb = inline_limit_mb * 1024
+
+                    # 목록(경로·sha)과 표시 설정이 그대로면 지난번 HTML 재사용 (Data URL이 없는 경우만 저장됨)
+                    list_sig = (owner, repo, branch, is_private, inline_limit_kb,
+                                tuple((f["rel_path"], f["sha"]) for f in files_data))
+                    cached = st.session_state.get("_file_list_html")
+                    if cached is not None and cached[0] == list_sig:
+                        _, list_html, rest_json, n_rows = cached
+                    else:
+                        # 비공개 리포만 서버에서 받아 Data URL로 심는다 (토큰을 브라우저에 넘기지 않기 위해).
+                        # 공개 리포는 클릭 시 브라우저가 raw에서 직접 받으므로 여기서는 URL만 보낸다.
+                        # 인라인 대상 파일은 공용 풀에서 한꺼번에 받아 RTT를 겹친다
+                        inline_futs = {
+                            f["rel_path"]: _gh_submit(get_raw_file_bytes, owner, repo, branch, f["rel_path"], token, sha=f.get("sha"))
+                            for f in files_data
+                            if is_private and inline_limit_kb > 0 and f["size_kb"] <= inline_limit_kb
+                        }
+
+                        now_ts = int(time.time())   # 모든 행이 같은 값 (클릭 시 JS가 다시 채움)
+                        rows = []
+                        for f in files_data:
+                            # 메모리 절약: 기본적으로 Data URL을 만들지 않음
+                            data_uri = ""
+                            raw_link = f["raw_url"]
+                            gh_web  = f"https://github.com/{owner}/{repo}/blob/{branch}/{f['rel_path']}?raw=1"
+                            fut = inline_futs.get(f["rel_path"])
+                            if fut is not None:
+                                try:
+                                    data_uri = build_data_uri(fut.result(), os.path.splitext(f["name"])[1])
+                                except Exception:
+                                    data_uri = ""
+                            lazy_dl  = (not is_private) and inline_limit_kb > 0 and f["size_kb"] <= inline_limit_kb
+                            dl_title = "다운로드" + ("" if data_uri else (" (GitHub 로그인 필요)" if is_private else ""))
+                            copy_url  = gh_web if is_private else raw_link
+                            copy_note = "(private: 로그인 필요)" if is_private else ""
+
+                            enc = _b64.urlsafe_b64encode(f["rel_path"].encode("utf-8")).decode("ascii")
+                            # 이스케이프는 행마다 이름과 URL 두 번만: enc(urlsafe base64)·Data URL·고정 문구에는 바꿀 문자가 없음
+                            del_e = f"?del={enc}&amp;ts={now_ts}"
+                            name_e, url_e = _html.escape(f["name"]), _html.escape(copy_url)
+                            dl_e = data_uri or url_e
+                            rows.append(
+                                f'<div class="row" data-del="{del_e}" title="{name_e}">'
+                                f'<div class="name">{name_e}</div>'
+                                f'<div class="size">{f["size_kb"]} KB</div>'
+                                f'<div class="btns">'
+                                f'<a class="btn dl" href="{dl_e}" data-href="{dl_e}" target="_blank" rel="noopener noreferrer" '
+                                f'download="{name_e}"{" data-fetch" if lazy_dl else ""} title="{dl_title}">{SVG_DOWNLOAD}</a>'
+                                f'<button class="btn copy" data-copy="{url_e}" title="URL 복사 {copy_note}">{SVG_LINK}</button>'
+                                f'<button class="btn delete" data-del="{del_e}" title="삭제">{SVG_TRASH}</button>'
+                                f'</div></div>'
+                            )
+
+                        list_html = "\n".join(rows[:FILE_LIST_EAGER_ROWS])
+                        # </script>로 끝나지 않도록 "</"를 이스케이프
+                        rest_json = _json.dumps(rows[FILE_LIST_EAGER_ROWS:], ensure_ascii=False).replace("</", "<\\/")
+                        n_rows = len(rows)
+                        if inline_futs:
+                            # Data URL이 든 HTML은 세션마다 수백 MB가 될 수 있으므로 보관하지 않음.
+                            # 다음 rerun에서는 blob 본문 캐시(sha 기준)에서 다시 인코딩만 함
+                            st.session_state.pop("_file_list_html", None)
+                        else:
+                            st.session_state._file_list_html = (list_sig, list_html, rest_json, n_rows)
+                    comp_height = max(72, min(800, 12 + 56 * n_rows))
+
+                    html_render = _FILE_LIST_TPL.substitute(list_html=list_html, rest_json=rest_json)   # 한 번에 치환 (파일명의 $ 문자열 안전)
+                    st_html(html_render, height=comp_height)
+                else:
+                    st.info("이 폴더에 파일이 없거나 접근할 수 없습니다.")
+            except Exception as e:
+                st.error(f"목록 조회 오류: {e}")
+
+@st.fragment
+def _memo_fragment(memo_filename: str):
+    """메모 편집 영역. 저장/불러오기/Clear는 이 영역만 다시 그린다."""
+    if ready and not st.session_state._memo_autoloaded:
+        try:
+            sha, body = get_file_raw_and_sha(owner, repo, branch, memo_filename, token)
+            st.session_state._memo_sha = sha
+            if body:
+                st.session_state.memo_area = body.decode("utf-8", errors="replace")
+        except Exception:
+            pass
+        finally:
+            st.session_state._memo_autoloaded = True
+
+    if "load_memo" not in st.session_state:  st.session_state.load_memo  = False
+    if "clear_memo" not in st.session_state: st.session_state.clear_memo = False
+
+    if st.session_state.load_memo and ready:
+        try:
+            sha, body = get_file_raw_and_sha(owner, repo, branch, memo_filename, token)
+            st.session_state._memo_sha = sha
+            if body:
+                st.session_state.memo_area = body.decode("utf-8", errors="replace")
+                st.toast("메모 불러옴")
+            else:
+                st.session_state.memo_area = ""
+                st.toast("메모 파일이 아직 없습니다.")
+        except Exception as e:
+            st.error(f"불러오기 실패: {e}")
+        finally:
+            st.session_state.load_memo = False
+
+    def _put_memo(content: bytes, message: str) -> None:
+        # 마지막으로 읽거나 쓴 sha를 그대로 사용 — 다른 기기에서 바뀌어 거절되면 최신 sha로 한 번 더
+        sha = st.session_state.get("_memo_sha")
+        try:
+            res = put_file(owner, repo, branch, memo_filename, content, token, message, sha)
+        except RuntimeError:
+            sha, _ = get_file_sha_if_exists(owner, repo, branch, memo_filename, token)
+            res = put_file(owner, repo, branch, memo_filename, content, token, message, sha)
+        st.session_state._memo_sha = res["content"]["sha"]
+
+    if st.session_state.clear_memo and ready:
+        try:
+            _put_memo(b"", "Clear memo")
+            st.session_state.memo_area = ""
+            st.toast("메모를 비웠습니다")
+        except Exception as e:
+            st.error(f"Clear 실패: {e}")
+        finally:
+            st.session_state.clear_memo = False
 
-    st_html(SNIP_TEMPLATE.substitute(CHIPS_HTML=chips_html), height=100)
+    st.text_area("여기에 붙여넣고 저장하세요 (Markdown)", key="memo_area", height=220)
+
+    st.markdown('<div class="memo-btn-row">', unsafe_allow_html=True)
+    c1, c2, c3, _sp = st.columns([0.12, 0.22, 0.12, 1], gap="small")
+    with c1:
+        if st.button("저장", key="memo_save_btn", type="primary", use_container_width=True, help="메모를 현재 파일에 저장"):
+            try:
+                _put_memo(st.session_state.get("memo_area", "").encode("utf-8"), "Update memo")
+                st.toast("메모 저장 완료")
+            except Exception as e:
+                st.error(f"저장 실패: {e}")
+    with c2:
+        if st.button("불러오기", key="memo_load_btn", use_container_width=True):
+            st.session_state.load_memo = True
+            _rerun_fragment()
+    with c3:
+        if st.button("Clear", key="memo_clear_btn", use_container_width=True):
+            st.session_state.clear_memo = True
+            _rerun_fragment()
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# ---------- TAB 2: 메모 ----------
+with tab2:
+    st.header("② 크로스디바이스 메모장")
+
+    memo_folder = ensure_folder_path(st.session_state.memo_folder)
+    memo_filename = path_join(memo_folder, "memo.md")
+    st.caption(f"메모 저장 위치: `{memo_filename}`")
+    _memo_fragment(memo_filename)
+
+@st.fragment
+def _snippet_bar_fragment():
+    """칩 바 + 등록 입력. 등록은 이 영역만 다시 그린다."""
+    if st.session_state._snip_clear:
+        try:
+            st.session_state["snip_input"] = ""
+        except Exception:
+            pass
+        st.session_state._snip_clear = False
+
+    # 스니펫 내용이 그대로면 지난번 칩 HTML 재사용
+    items = [_normalize_snippet_item(snip) for snip in st.session_state.snippets]
+    sig = tuple((obj.get("t", ""), obj.get("hint", "")) for obj in items)
+    cached = st.session_state.get("_chips_html")
+    if cached is not None and cached[0] == sig:
+        chips_html = cached[1]
+    else:
+        labels_html = []
+        for idx, (t, hint) in enumerate(sig):
+            label = (t or "").replace("\n", " ").strip()
+            safe_label = _html.escape(label)
+            safe_t = _html.escape(t or "")
+            safe_hint = _html.escape(hint or "")
+            title_attr = f' title="{safe_hint}"' if hint else ""
+            labels_html.append(
+                f'<button class="chip" draggable="true" data-idx="{idx}" data-t="{safe_t}" data-hint="{safe_hint}"{title_attr}>'
+                f'  <span class="txt">{safe_label}</span>'
+                f'</button>'
+            )
+        chips_html = "\n".join(labels_html) if labels_html else '<span class="empty">등록된 스니펫이 없습니다</span>'
+        st.session_state._chips_html = (sig, chips_html)
+
+
+    st_html(_SNIP_BAR_HTML.replace("$CHIPS_HTML", chips_html), height=100)
 
     st.caption("위: 스니펫 — 드래그로 순서 변경 · 클릭=복사 · 우클릭=삭제 · '제목:내용' 입력 시 제목은 툴팁, 내용은 버튼 라벨이 됩니다.")
 
@@ -1730,17 +2464,35 @@ with tab3:
 
                     snippet_folder = ensure_folder_path(st.session_state.snippet_folder)
                     snippet_path = path_join(snippet_folder, "snippets.json")
-                    current, sha = load_snippets(owner, repo, branch, snippet_path, token)
-                    current.append(item)
-                    new_sha = save_snippets(owner, repo, branch, snippet_path, token, current, sha)
-                    st.session_state.snippets = current
-                    st.session_state._snip_sha = new_sha
+                    current, sha = snippets_for_write(owner, repo, branch, snippet_path, token)
+                    updated = [*current, item]   # 저장이 실패하면 세션 목록은 그대로 둠
+                    save_snippets(owner, repo, branch, snippet_path, token, updated, sha, already_normalized=True)
+                    st.session_state.snippets = updated
                     st.session_state._snip_clear = True
                     st.toast("스니펫 등록 완료")
-                    st.rerun()
+                    _rerun_fragment()
                 except Exception as e:
+                    st.session_state._snippets_loaded = False
                     st.error(f"등록 실패: {e}")
 
+# ---------- TAB 3: 스니펫 ----------
+with tab3:
+    st.header("③ Text Snippet")
+
+    snippet_folder = ensure_folder_path(st.session_state.snippet_folder)
+    snippet_path = path_join(snippet_folder, "snippets.json")
+
+    if ready and not st.session_state._snippets_loaded:
+        try:
+            snips, _ = load_snippets(owner, repo, branch, snippet_path, token)
+            st.session_state.snippets = snips
+        except Exception as e:
+            st.warning(f"스니펫 로드 실패: {e}")
+        finally:
+            st.session_state._snippets_loaded = True
+
+    _snippet_bar_fragment()
+
 # ---------- TAB 4: 노동요 ----------
 with tab4:
     render_labor_song_tab()